@@ -1,37 +1,124 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Resort, Booking, Payment, Guest, GalleryImage ,CustomUser, PasswordResetOTP
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.urls import path
+from django.utils.dateparse import parse_date
+from .exports import FORMATS, export_filename, stream_export
+from .models import Resort, Booking, Payment, Guest, GalleryImage ,CustomUser, PasswordResetOTP, Job
+from .receipts import stream_receipts_zip
+
+
+class ExportMixin:
+    """Adds an ``export/`` view streaming ``export_dataset`` as CSV or JSON Lines."""
+    export_dataset = None
+
+    def get_urls(self):
+        urls = [
+            path(
+                "export/",
+                self.admin_site.admin_view(self.export_view),
+                name=f"{self.opts.app_label}_{self.opts.model_name}_export",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_view(self, request):
+        """Stream rows filtered by ?from=, ?to=, ?status= and ?payment_status=."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get("format", "csv")
+        if fmt not in FORMATS:
+            return HttpResponseBadRequest("format must be csv or jsonl")
+        try:
+            date_from = parse_date(request.GET.get("from") or "") or None
+            date_to = parse_date(request.GET.get("to") or "") or None
+        except ValueError:
+            return HttpResponseBadRequest("Pass dates as YYYY-MM-DD")
+        if date_from and date_to and date_from > date_to:
+            return HttpResponseBadRequest("from must not be after to")
+
+        rows = stream_export(
+            self.export_dataset,
+            fmt,
+            date_from=date_from,
+            date_to=date_to,
+            status=request.GET.get("status"),
+            payment_status=request.GET.get("payment_status"),
+        )
+        response = StreamingHttpResponse(rows, content_type=FORMATS[fmt])
+        filename = export_filename(self.export_dataset, fmt, date_from, date_to)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ['guest_name', 'resort_name', 'guest_phone', 'check_in', 'check_out', 'booking_status']
     list_filter = ['booking_status', 'check_in']
     search_fields = ['guest_name', 'guest_email', 'guest_phone']
+    list_select_related = ['resort']
+    export_dataset = "bookings"
 
     def resort_name(self, obj):
         return obj.resort.name
     resort_name.short_description = "Resort"
 
+    def get_urls(self):
+        urls = [
+            path(
+                "receipts/export/",
+                self.admin_site.admin_view(self.export_receipts),
+                name="app_booking_export_receipts",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_receipts(self, request):
+        """Stream a ZIP of receipts for bookings created between ?from= and ?to=."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            date_from = parse_date(request.GET.get("from", ""))
+            date_to = parse_date(request.GET.get("to", ""))
+        except ValueError:
+            date_from = date_to = None
+        if not date_from or not date_to or date_from > date_to:
+            return HttpResponseBadRequest("Pass ?from=YYYY-MM-DD&to=YYYY-MM-DD")
+
+        bookings = (
+            Booking.objects.filter(created_at__date__range=(date_from, date_to))
+            .select_related("resort")
+            .order_by("id")
+            .iterator(chunk_size=200)
+        )
+        response = StreamingHttpResponse(stream_receipts_zip(bookings), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="receipts_{date_from}_{date_to}.zip"'
+        return response
+
 
 @admin.register(Resort)
 class ResortAdmin(admin.ModelAdmin):
-    list_display = ['name', 'location', 'price_per_guest']
+    list_display = ['name', 'location', 'price_per_guest', 'capacity']
     search_fields = ['name', 'location']
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ['booking', 'payment_id', 'payment_method', 'payment_time', 'amount_paid']
     search_fields = ['payment_id']
+    list_select_related = ['booking__resort']
     list_filter = ['payment_time', 'payment_method']
+    export_dataset = "payments"
 
 
 @admin.register(Guest)
-class GuestAdmin(admin.ModelAdmin):
+class GuestAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ['full_name', 'booking', 'age']
     search_fields = ['full_name']
+    list_select_related = ['booking__resort']
     list_filter = ['age']
+    export_dataset = "guests"
 
 
 @admin.register(GalleryImage)
@@ -40,6 +127,13 @@ class GalleryImageAdmin(admin.ModelAdmin):
     search_fields = ['title']
     list_filter = ['uploaded_at']
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'priority', 'attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['last_error']
+
+
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
     list_display = ("email", "phone", "is_staff", "is_active")
@@ -61,4 +155,4 @@ class CustomUserAdmin(UserAdmin):
 
 # admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(CustomUser, CustomUserAdmin)
-admin.site.register(PasswordResetOTP)
+admin.site.register(PasswordResetOTP, list_select_related=['user'])
@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+
+from .models import Booking, Resort
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+class BookingError(Exception):
+    pass
+
+
+class BookingUnavailable(BookingError):
+    pass
+
+
+class IdempotencyKeyReused(BookingError):
+    pass
+
+
+def clean_idempotency_key(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    if len(value) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise BookingError("Idempotency key is too long.")
+    return value
+
+
+# What a replay must repeat for the stored booking to be its answer
+IDEMPOTENT_FIELDS = ("check_in", "check_out", "guests")
+
+
+def _existing_booking(idempotency_key, user, resort, fields):
+    booking = Booking.objects.filter(idempotency_key=idempotency_key).first()
+    if booking is None:
+        return None
+    if booking.user_id != (user.id if user else None):
+        raise IdempotencyKeyReused("Idempotency key belongs to another booking.")
+    if booking.resort_id != resort.pk or any(
+        getattr(booking, name) != fields.get(name) for name in IDEMPOTENT_FIELDS
+    ):
+        raise IdempotencyKeyReused("Idempotency key was already used for a different booking.")
+    return booking
+
+
+def reserve_booking(resort, idempotency_key=None, user=None, **fields):
+    """
+    Create a booking for ``resort`` if it still has room for the stay.
+
+    Returns ``(booking, created)``. When ``idempotency_key`` was already used
+    for the same stay, the original booking is returned with ``created=False``
+    and nothing is written; reusing it for another stay raises
+    ``IdempotencyKeyReused``. The availability check and insert run in one transaction holding
+    a row lock on the resort, so concurrent requests cannot oversell it.
+    """
+    if idempotency_key:
+        booking = _existing_booking(idempotency_key, user, resort, fields)
+        if booking:
+            return booking, False
+
+    try:
+        with transaction.atomic():
+            resort = Resort.objects.select_for_update().get(pk=resort.pk)
+            if not resort.is_available(fields["check_in"], fields["check_out"], fields["guests"]):
+                raise BookingUnavailable("Resort is fully booked for these dates.")
+
+            booking = Booking.objects.create(
+                resort=resort,
+                user=user,
+                idempotency_key=idempotency_key,
+                **fields,
+            )
+    except IntegrityError:
+        # A concurrent request with the same key won the race
+        if not idempotency_key:
+            raise
+        booking = _existing_booking(idempotency_key, user, resort, fields)
+        if booking is None:
+            raise
+        return booking, False
+
+    return booking, True
@@ -0,0 +1,79 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+# Content groups a cached page can depend on. Saving a model bumps its
+# group's version, which retires every page and fragment keyed on it.
+PAGE_GROUPS = ("blog", "gallery", "resorts")
+
+
+def cache_is_shared():
+    """Whether every worker process reads and writes the same default cache."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def _version_key(group):
+    return f"page_version:{group}"
+
+
+def page_version(group):
+    return cache.get_or_set(_version_key(group), 1, None)
+
+
+def bump_page_version(group):
+    try:
+        cache.incr(_version_key(group))
+    except ValueError:
+        cache.set(_version_key(group), 2, None)
+
+
+def page_timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+
+
+def cache_public_page(*groups):
+    """
+    Cache the whole response for anonymous GET requests.
+
+    The key covers the URL and the versions of ``groups``. Requests with
+    pending flash messages bypass the cache. So do responses that used the
+    CSRF token, since that token is tied to one visitor's cookie. Logged-in
+    users are served by ``{% cache %}`` fragments in the templates instead.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            if len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            versions = ".".join(str(page_version(group)) for group in groups)
+            url = hashlib.sha256(request.build_absolute_uri().encode("utf-8")).hexdigest()
+            key = f"page:{view.__name__}:{versions}:{url}"
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                # Logged-in visitors get a different page for the same URL
+                patch_vary_headers(response, ("Cookie",))
+                return response
+
+            response = view(request, *args, **kwargs)
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            ):
+                cache.set(key, (response.content, response["Content-Type"]), page_timeout())
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,21 @@
+from django.core.checks import Tags, Warning, register
+
+from .caching import cache_is_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process.",
+            hint=(
+                "Set CACHE_BACKEND to a shared cache such as Redis or Memcached when "
+                "running more than one worker. Until then wishlist counts are only "
+                "cached for a few seconds and stale dashboard widgets are refreshed "
+                "by the web process instead of the job workers."
+            ),
+            id="app.W001",
+        )
+    ]
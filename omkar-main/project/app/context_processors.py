@@ -0,0 +1,19 @@
+from .caching import PAGE_GROUPS, page_timeout, page_version
+from .wishlist import wishlist_count
+
+
+def wishlist(request):
+    return {"wishlist_count": wishlist_count(request.user)}
+
+
+class _PageVersions:
+    """Lazy ``{{ page_versions.<group> }}`` lookups for template fragment keys."""
+
+    def __getattr__(self, group):
+        if group not in PAGE_GROUPS:
+            raise AttributeError(group)
+        return page_version(group)
+
+
+def page_cache(request):
+    return {"page_versions": _PageVersions(), "page_cache_timeout": page_timeout()}
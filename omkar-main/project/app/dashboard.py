@@ -0,0 +1,134 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .caching import cache_is_shared
+from .jobs import PRIORITY_LOW, enqueue
+from .models import BookingDailyStats
+
+# Widgets younger than this are served as-is; older ones are served stale
+# while they are recomputed in the background, until they expire from the cache.
+FRESH_FOR = 60
+STALE_FOR = 60 * 60
+REFRESH_LOCK_TIMEOUT = 5 * 60
+
+
+def _stats(date_from, date_to):
+    stats = BookingDailyStats.objects.all()
+    if date_from:
+        stats = stats.filter(day__gte=date_from)
+    if date_to:
+        stats = stats.filter(day__lte=date_to)
+    return stats
+
+
+def summary(date_from, date_to):
+    totals = _stats(date_from, date_to).aggregate(bookings=Sum("bookings"), revenue=Sum("revenue"))
+    today = BookingDailyStats.objects.filter(day=timezone.localdate()).aggregate(total=Sum("bookings"))
+    return {
+        "total_users": get_user_model().objects.count(),
+        "total_bookings": totals["bookings"] or 0,
+        "total_revenue": float(totals["revenue"] or 0),
+        "today_bookings": today["total"] or 0,
+    }
+
+
+def monthly(date_from, date_to):
+    rows = (
+        _stats(date_from, date_to)
+        .filter(paid_bookings__gt=0)
+        .annotate(month=TruncMonth("day"))
+        .values("month")
+        .annotate(revenue=Sum("revenue"), bookings=Sum("paid_bookings"))
+        .order_by("month")
+    )
+    return {
+        "labels": [row["month"].strftime("%b %Y") for row in rows],
+        "revenue": [float(row["revenue"]) for row in rows],
+        "bookings": [row["bookings"] for row in rows],
+    }
+
+
+def top_resorts(date_from, date_to):
+    rows = (
+        _stats(date_from, date_to)
+        .values("resort__name")
+        .annotate(count=Sum("bookings"))
+        .order_by("-count")[:5]
+    )
+    return {
+        "labels": [row["resort__name"] for row in rows],
+        "counts": [row["count"] for row in rows],
+    }
+
+
+WIDGETS = {
+    "summary": summary,
+    "monthly": monthly,
+    "top-resorts": top_resorts,
+}
+
+
+def _key(widget, date_from, date_to):
+    return f"dashboard:{widget}:{date_from or ''}:{date_to or ''}"
+
+
+def refresh_widget(widget, date_from=None, date_to=None):
+    entry = {"data": WIDGETS[widget](date_from, date_to), "computed_at": time.time()}
+    cache.set(_key(widget, date_from, date_to), entry, STALE_FOR)
+    return entry
+
+
+def get_widget(widget, date_from=None, date_to=None):
+    """
+    Return ``(data, computed_at)`` for a widget, computing it inline only on
+    a cold cache. Stale entries are returned immediately and a single
+    background refresh is started for them.
+    """
+    key = _key(widget, date_from, date_to)
+    entry = cache.get(key)
+    if entry is None:
+        entry = refresh_widget(widget, date_from, date_to)
+    elif time.time() - entry["computed_at"] > FRESH_FOR:
+        # cache.add is atomic, so concurrent requests start one refresh
+        if cache.add(f"{key}:refreshing", 1, REFRESH_LOCK_TIMEOUT):
+            _start_refresh(widget, date_from, date_to)
+    return entry["data"], entry["computed_at"]
+
+
+def _start_refresh(widget, date_from, date_to):
+    if cache_is_shared():
+        enqueue(
+            "refresh_dashboard_widget",
+            priority=PRIORITY_LOW,
+            max_attempts=1,
+            widget=widget,
+            date_from=date_from.isoformat() if date_from else None,
+            date_to=date_to.isoformat() if date_to else None,
+        )
+    else:
+        # A job worker would only refresh its own copy of a per-process
+        # cache, so recompute here, where the stale entry is served from
+        threading.Thread(
+            target=_refresh_in_thread, args=(widget, date_from, date_to), name="dashboard-refresh", daemon=True,
+        ).start()
+
+
+def _refresh_in_thread(widget, date_from, date_to):
+    try:
+        finish_refresh(widget, date_from, date_to)
+    finally:
+        connection.close()
+
+
+def finish_refresh(widget, date_from=None, date_to=None):
+    try:
+        refresh_widget(widget, date_from, date_to)
+    finally:
+        cache.delete(f"{_key(widget, date_from, date_to)}:refreshing")
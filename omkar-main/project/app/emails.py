@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, send_mail
+
+from .instrumentation import track
+from .receipts import receipt_bytes
+
+
+def send_receipt_email(booking):
+    mail = EmailMessage(
+        "Your Receipt",
+        "Attached is your receipt.",
+        settings.EMAIL_HOST_USER,
+        [booking.guest_email],
+    )
+    # Same cached PDF as the download_receipt view
+    mail.attach(f"Receipt_{booking.id}.pdf", receipt_bytes(booking), "application/pdf")
+    with track("smtp", "receipt"):
+        mail.send()
+
+
+def send_refund_email(booking):
+    with track("smtp", "refund"):
+        send_mail(
+            "Refund Processed",
+            f"Your refund of ₹{booking.total_price} is processed.",
+            settings.EMAIL_HOST_USER,
+            [booking.guest_email],
+        )
+
+
+def send_password_reset_otp(otp):
+    with track("smtp", "password_reset_otp"):
+        send_mail(
+            subject="Your Password Reset OTP - The Arabian",
+            message=f"Your OTP for password reset is: {otp.otp}",
+            from_email=settings.EMAIL_HOST_USER,
+            recipient_list=[otp.user.email],
+            fail_silently=False,
+        )
@@ -0,0 +1,132 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Booking, Guest, Payment
+
+# Rows fetched per database round-trip; memory stays flat for any range
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+# Each dataset: model, the datetime column the date range applies to, the
+# status filters it accepts, and (header, lookup) pairs. Lookups that span
+# relations are resolved by joins in the same query.
+DATASETS = {
+    "bookings": {
+        "model": Booking,
+        "date_field": "created_at",
+        "filters": {"status": "booking_status", "payment_status": "payment_status"},
+        "columns": [
+            ("id", "id"),
+            ("created_at", "created_at"),
+            ("resort", "resort__name"),
+            ("user_email", "user__email"),
+            ("guest_name", "guest_name"),
+            ("guest_email", "guest_email"),
+            ("guest_phone", "guest_phone"),
+            ("check_in", "check_in"),
+            ("check_out", "check_out"),
+            ("guests", "guests"),
+            ("total_price", "total_price"),
+            ("advance_paid", "advance_paid"),
+            ("pending_amount", "pending_amount"),
+            ("booking_status", "booking_status"),
+            ("payment_status", "payment_status"),
+            ("razorpay_order_id", "razorpay_order_id"),
+            ("checkin_verified", "checkin_verified"),
+        ],
+    },
+    "payments": {
+        "model": Payment,
+        "date_field": "payment_time",
+        "filters": {"status": "booking__booking_status", "payment_status": "booking__payment_status"},
+        "columns": [
+            ("id", "id"),
+            ("payment_time", "payment_time"),
+            ("booking_id", "booking_id"),
+            ("resort", "booking__resort__name"),
+            ("guest_email", "booking__guest_email"),
+            ("payment_id", "payment_id"),
+            ("payment_method", "payment_method"),
+            ("amount_paid", "amount_paid"),
+            ("refunded", "refunded"),
+            ("refund_amount", "refund_amount"),
+            ("refund_date", "refund_date"),
+        ],
+    },
+    "guests": {
+        "model": Guest,
+        "date_field": "booking__created_at",
+        "filters": {"status": "booking__booking_status", "payment_status": "booking__payment_status"},
+        "columns": [
+            ("id", "id"),
+            ("booking_id", "booking_id"),
+            ("booking_created_at", "booking__created_at"),
+            ("resort", "booking__resort__name"),
+            ("full_name", "full_name"),
+            ("age", "age"),
+            ("check_in", "booking__check_in"),
+            ("check_out", "booking__check_out"),
+        ],
+    },
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(dataset, date_from=None, date_to=None, **filters):
+    """Tuples for ``dataset`` in id order, streamed from a server-side cursor."""
+    spec = DATASETS[dataset]
+    rows = spec["model"].objects.all()
+    if date_from:
+        rows = rows.filter(**{f"{spec['date_field']}__gte": _day_start(date_from)})
+    if date_to:
+        rows = rows.filter(**{f"{spec['date_field']}__lt": _day_start(date_to + timedelta(days=1))})
+    for name, value in filters.items():
+        if value:
+            rows = rows.filter(**{spec["filters"][name]: value})
+
+    lookups = [lookup for _, lookup in spec["columns"]]
+    return rows.order_by("id").values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def stream_export(dataset, fmt="csv", **options):
+    """Yield ``dataset`` as CSV or JSON Lines text, one row at a time."""
+    headers = [header for header, _ in DATASETS[dataset]["columns"]]
+    rows = export_rows(dataset, **options)
+    if fmt == "jsonl":
+        return _jsonl_lines(headers, rows)
+    return _csv_lines(headers, rows)
+
+
+def export_filename(dataset, fmt, date_from=None, date_to=None):
+    stamp = f"_{date_from or 'start'}_{date_to or timezone.localdate()}"
+    return f"{dataset}{stamp}.{fmt}"
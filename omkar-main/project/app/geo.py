@@ -0,0 +1,86 @@
+import math
+
+from django.db.models import F, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+
+# Nearest-K search starts with this radius and doubles it until it has K hits,
+# then ranks every resort once the radius would pass MAX_RADIUS_KM
+INITIAL_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 2000.0
+
+
+def parse_point(params):
+    """Return ``(lat, lng)`` from ``params`` or ``None`` if missing/invalid."""
+    try:
+        lat = float(params["lat"])
+        lng = float(params["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def bounding_box(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 0.01)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def _haversine_km(lat, lng):
+    dlat = Radians(F("latitude") - Value(lat))
+    dlng = Radians(F("longitude") - Value(lng))
+    a = (
+        Power(Sin(dlat / 2), 2)
+        + Cos(Value(math.radians(lat))) * Cos(Radians(F("latitude"))) * Power(Sin(dlng / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def by_distance(resorts, lat, lng):
+    """Resorts annotated with ``distance_km`` from the point, nearest first."""
+    return resorts.annotate(distance_km=_haversine_km(lat, lng)).order_by("distance_km", "id")
+
+
+def within_radius(resorts, lat, lng, radius_km):
+    """
+    Resorts within ``radius_km`` of the point, nearest first, annotated with
+    ``distance_km``. The bounding box uses the (latitude, longitude) index so
+    exact distances are only computed for nearby candidates.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    return by_distance(
+        resorts.filter(
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+        ),
+        lat,
+        lng,
+    ).filter(distance_km__lte=radius_km)
+
+
+def nearest(resorts, lat, lng, k):
+    """
+    The ``k`` resorts nearest to the point, widening the search box as needed.
+
+    Each radius costs one query, which fetches the candidates themselves;
+    the page that has ``k`` of them is returned already evaluated. Past
+    MAX_RADIUS_KM the box is dropped and every resort is ranked, so sparse
+    data still yields ``k`` results rather than stopping short.
+    """
+    radius = INITIAL_RADIUS_KM
+    while radius <= MAX_RADIUS_KM:
+        page = within_radius(resorts, lat, lng, radius)[:k]
+        if len(page) >= k:
+            return page
+        radius *= 2
+    return by_distance(resorts, lat, lng)[:k]
+
+
+def nearby_resorts(resorts, lat, lng, radius_km=None, limit=20):
+    if radius_km:
+        return within_radius(resorts, lat, lng, min(radius_km, MAX_RADIUS_KM))[:limit]
+    return nearest(resorts, lat, lng, limit)
@@ -0,0 +1,98 @@
+import json
+import posixpath
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Target widths for srcset. Targets within 20% of the original width are
+# skipped in favour of a variant at the original width; nothing is upscaled.
+WIDTHS = (320, 640, 1024, 1600)
+
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+MANIFEST_TIMEOUT = 60 * 60 * 24
+
+
+def _variant_base(name):
+    stem, _ = posixpath.splitext(name)
+    return f"variants/{stem}"
+
+
+def variant_path(name, width, ext):
+    return f"{_variant_base(name)}_{width}.{ext}"
+
+
+def _manifest_path(name):
+    return f"{_variant_base(name)}.json"
+
+
+def _cache_key(name):
+    return f"image_variants:{name}"
+
+
+def _save(path, data):
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(data))
+
+
+def _encode(image, ext):
+    fmt, _, options = VARIANT_FORMATS[ext]
+    if fmt == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha channel; flatten onto white
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(name):
+    """
+    Write resized WebP and JPEG copies of the stored image ``name`` and a
+    manifest listing their widths. Returns the widths.
+    """
+    with default_storage.open(name, "rb") as fp:
+        original = ImageOps.exif_transpose(Image.open(fp))
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+
+    widths = [width for width in WIDTHS if width * 1.2 <= original.width]
+    if original.width < WIDTHS[-1] * 1.2:
+        widths.append(min(original.width, WIDTHS[-1]))
+    for width in widths:
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for ext in VARIANT_FORMATS:
+            _save(variant_path(name, width, ext), _encode(resized, ext))
+
+    _save(_manifest_path(name), json.dumps({"widths": widths}).encode("utf-8"))
+    cache.set(_cache_key(name), widths, MANIFEST_TIMEOUT)
+    return widths
+
+
+def variant_widths(name):
+    """Widths available for ``name`` (empty until its variants are generated)."""
+    widths = cache.get(_cache_key(name))
+    if widths is None:
+        try:
+            with default_storage.open(_manifest_path(name), "rb") as fp:
+                widths = json.load(fp)["widths"]
+        except (OSError, ValueError, KeyError):
+            widths = []
+        # Missing manifests are cached briefly so new uploads show up soon
+        cache.set(_cache_key(name), widths, MANIFEST_TIMEOUT if widths else 60)
+    return widths
+
+
+def srcset(name, ext, widths):
+    return ", ".join(f"{default_storage.url(variant_path(name, width, ext))} {width}w" for width in widths)
@@ -0,0 +1,132 @@
+import atexit
+import logging
+import queue
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("app.requests")
+
+# Long statements are cut in the log line; the start identifies the query
+MAX_SQL_LENGTH = 500
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Counters for one request, filled in by the query wrapper and track()."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.outbound = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper(); times every statement
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.query_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    def add(self, service, elapsed):
+        self.outbound[service] = self.outbound.get(service, 0.0) + elapsed
+
+
+@contextmanager
+def track(service, operation):
+    """
+    Time an outbound call (``razorpay``, ``smtp``...) for Prometheus and,
+    inside a request, for that request's log line.
+    """
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe_external(service, operation, elapsed, failed)
+        current = _current.get()
+        if current is not None:
+            current.add(service, elapsed)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestMetricsMiddleware:
+    """Log one JSON line per request with its latency, SQL and outbound call times."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorded = RequestMetrics()
+        token = _current.set(recorded)
+        start = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorded))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            _current.reset(token)
+            match = getattr(request, "resolver_match", None)
+            view = match.view_name if match else None
+            metrics.observe_request(view, request.method, status, duration)
+            logger.info(
+                "request",
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "view": view,
+                    "status": status,
+                    "duration_ms": _ms(duration),
+                    "db_queries": recorded.queries,
+                    "db_time_ms": _ms(recorded.query_time),
+                    "slowest_query_ms": _ms(recorded.slowest_time),
+                    "slowest_query": (recorded.slowest_sql or "")[:MAX_SQL_LENGTH] or None,
+                    "outbound_ms": {name: _ms(t) for name, t in recorded.outbound.items()},
+                },
+            )
+
+
+class QueuedStreamHandler(QueueHandler):
+    """
+    Write to a stream from a background thread so logging never blocks a
+    request on I/O. Records are formatted on that thread too.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # The queue stays in this process, so the record needs no pickling
+        return record
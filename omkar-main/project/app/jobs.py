@@ -0,0 +1,136 @@
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+BACKOFF_BASE = 30          # seconds before the first retry
+BACKOFF_MAX = 60 * 60      # never wait longer than an hour between retries
+LOCK_TIMEOUT = 10 * 60     # running jobs older than this are assumed lost
+
+TASKS = {}
+_tasks_loaded = False
+
+
+def task(func):
+    """Register ``func`` so workers can run it by name."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def _load_tasks():
+    global _tasks_loaded
+    if not _tasks_loaded:
+        import_module("app.tasks")
+        _tasks_loaded = True
+
+
+def enqueue(task_name, *, priority=PRIORITY_NORMAL, run_at=None, max_attempts=5, **payload):
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_next():
+    """Atomically mark the most urgent due job as running and return it."""
+    while True:
+        now = timezone.now()
+        job = (
+            Job.objects.filter(status="queued", run_at__lte=now)
+            .order_by("-priority", "run_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        # Conditional UPDATE: only one worker can flip queued -> running
+        claimed = Job.objects.filter(pk=job.pk, status="queued").update(
+            status="running", locked_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            job.status = "running"
+            job.locked_at = now
+            job.attempts += 1
+            return job
+
+
+def requeue_stale():
+    """
+    Recover running jobs whose worker died. Jobs with attempts left go back
+    to the queue; the rest fail, so a job that kills its worker stops there.
+    """
+    cutoff = timezone.now() - timedelta(seconds=LOCK_TIMEOUT)
+    stale = Job.objects.filter(status="running", locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed",
+        locked_at=None,
+        last_error=f"Worker lost: still running after {LOCK_TIMEOUT}s and no attempts left.",
+    )
+    if failed:
+        logger.error("%d stale jobs failed permanently", failed)
+    return failed + stale.update(status="queued", locked_at=None)
+
+
+def run_job(job):
+    _load_tasks()
+    try:
+        func = TASKS[job.task]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s failed permanently:\n%s", job, error)
+            Job.objects.filter(pk=job.pk).update(status="failed", locked_at=None, last_error=error)
+        else:
+            logger.warning("Job %s failed, retrying:\n%s", job, error)
+            Job.objects.filter(pk=job.pk).update(
+                status="queued",
+                locked_at=None,
+                last_error=error,
+                run_at=timezone.now() + backoff(job.attempts),
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status="done", locked_at=None)
+    return True
+
+
+def work(stop_event=None, poll_interval=1.0, burst=False):
+    """Process jobs until ``stop_event`` is set (or the queue drains in burst mode)."""
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    while not stop_event.is_set():
+        close_old_connections()
+        job = claim_next()
+        if job is None:
+            if burst:
+                break
+            requeue_stale()
+            stop_event.wait(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    connections.close_all()
+    return processed
@@ -0,0 +1,283 @@
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app import dashboard
+from app.instrumentation import RequestMetrics
+from app.models import Resort
+
+# The app's own "admin/dashboard/" route is shadowed by the admin site
+DASHBOARD_PATH = "/dashboard/"
+
+SEARCH_TERMS = ["beach", "pool", "spa", "hill", "lake", "goa", "yoga", "resort"]
+
+FLOWS = (
+    "index_search",
+    "resort_detail",
+    "book_resort",
+    "payment_page",
+    "booking_history",
+    "wishlist_toggle",
+    "admin_dashboard",
+)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class FakeRazorpay:
+    """Stands in for razorpay.Client, answering after a fixed gateway latency."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.order = self
+        self._ids = iter(range(1, sys.maxsize))
+        self._lock = threading.Lock()
+
+    def create(self, data):
+        time.sleep(self.latency)
+        with self._lock:
+            return {"id": f"order_bench_{next(self._ids)}", **data}
+
+
+class VirtualUser:
+    """One signed-in guest walking the booking funnel in a loop."""
+
+    def __init__(self, user, staff, resort_ids, flows, rng):
+        self.client = Client()
+        self.client.force_login(user)
+        self.staff_client = None
+        if staff is not None and "admin_dashboard" in flows:
+            self.staff_client = Client()
+            self.staff_client.force_login(staff)
+        self.resort_ids = resort_ids
+        self.flows = flows
+        self.rng = rng
+        self.results = defaultdict(list)   # flow -> [(seconds, queries, error or None)]
+
+    def _timed(self, flow, client, method, path, data=None):
+        recorded = RequestMetrics()
+        start = time.perf_counter()
+        error = None
+        try:
+            with connection.execute_wrapper(recorded):
+                response = getattr(client, method)(path, data)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+        except Exception as e:
+            response, error = None, f"{type(e).__name__}: {e}"
+        self.results[flow].append((time.perf_counter() - start, recorded.queries, error))
+        return response
+
+    def iteration(self):
+        rng = self.rng
+        resort_id = rng.choice(self.resort_ids)
+        if "index_search" in self.flows:
+            self._timed("index_search", self.client, "get", reverse("index"), {"search": rng.choice(SEARCH_TERMS)})
+        if "resort_detail" in self.flows:
+            self._timed("resort_detail", self.client, "get", reverse("resort_detail", args=[resort_id]))
+        if "book_resort" in self.flows:
+            check_in = timezone.localdate() + timedelta(days=rng.randint(7, 300))
+            response = self._timed("book_resort", self.client, "post", reverse("book_resort", args=[resort_id]), {
+                "guest_name": "Benchmark Guest",
+                "guest_phone": "9000000000",
+                "check_in": check_in.isoformat(),
+                "check_out": (check_in + timedelta(days=rng.randint(1, 4))).isoformat(),
+                "guests": str(rng.randint(1, 4)),
+                "idempotency_key": f"bench-{rng.getrandbits(64):x}",
+            })
+            location = response.get("Location") if response is not None else None
+            if "payment_page" in self.flows and location:
+                self._timed("payment_page", self.client, "get", location)
+        if "booking_history" in self.flows:
+            self._timed("booking_history", self.client, "get", reverse("booking_history"))
+        if "wishlist_toggle" in self.flows:
+            self._timed("wishlist_toggle", self.client, "get", reverse("wishlist_toggle", args=[resort_id]))
+        if self.staff_client is not None:
+            self._timed("admin_dashboard", self.staff_client, "get", DASHBOARD_PATH)
+            for widget in dashboard.WIDGETS:
+                self._timed("dashboard_widget", self.staff_client, "get", reverse("dashboard_widget", args=[widget]))
+
+    def run(self, deadline, iterations, start_barrier):
+        try:
+            start_barrier.wait()
+            done = 0
+            while time.monotonic() < deadline and (not iterations or done < iterations):
+                self.iteration()
+                done += 1
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the booking funnel with concurrent virtual users against this project's "
+        "database (run seed_data first) and report latency, throughput and queries per request. "
+        "Razorpay and SMTP are stubbed. Bookings made during the run are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users (default: 10).")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run (default: 30).")
+        parser.add_argument("--iterations", type=int, default=0, help="Stop each user after N funnels.")
+        parser.add_argument(
+            "--flows", default=",".join(FLOWS), help=f"Comma-separated subset of: {', '.join(FLOWS)}.",
+        )
+        parser.add_argument(
+            "--gateway-latency", type=float, default=150,
+            help="Milliseconds the stubbed Razorpay takes per order (default: 150).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", dest="json_path", help="Write the results as JSON to this file, '-' for stdout.")
+
+    def handle(self, *args, **options):
+        flows = [flow.strip() for flow in options["flows"].split(",") if flow.strip()]
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            raise CommandError(f"Unknown flows: {', '.join(sorted(unknown))}.")
+
+        User = get_user_model()
+        customers = list(User.objects.filter(is_staff=False, is_active=True).order_by("id")[:options["users"]])
+        if len(customers) < options["users"]:
+            raise CommandError(f"Need {options['users']} non-staff users; run seed_data first.")
+        staff = User.objects.filter(is_staff=True, is_active=True).first()
+        if staff is None and "admin_dashboard" in flows:
+            self.stderr.write("No staff user; skipping admin_dashboard.")
+            flows.remove("admin_dashboard")
+        resort_ids = list(Resort.objects.values_list("id", flat=True))
+        if not resort_ids:
+            raise CommandError("No resorts; run seed_data first.")
+
+        rng = random.Random(options["seed"])
+        gateway = FakeRazorpay(options["gateway_latency"] / 1000)
+        with (
+            mock.patch("app.payments.get_razorpay_client", return_value=gateway),
+            override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                ALLOWED_HOSTS=["testserver"],
+            ),
+        ):
+            # Skip the per-request log lines; the middleware itself still runs
+            request_log = logging.getLogger("app.requests")
+            request_log.disabled, was_disabled = True, request_log.disabled
+            try:
+                users = [
+                    VirtualUser(customer, staff, resort_ids, flows, random.Random(rng.random()))
+                    for customer in customers
+                ]
+                elapsed = self._run(users, options["duration"], options["iterations"])
+            finally:
+                request_log.disabled = was_disabled
+
+        report = self._report(users, elapsed, options, flows)
+        self._print(report)
+        if options["json_path"]:
+            text = json.dumps(report, indent=2)
+            if options["json_path"] == "-":
+                self.stdout.write(text)
+            else:
+                with open(options["json_path"], "w", encoding="utf-8") as f:
+                    f.write(text + "\n")
+                self.stdout.write(self.style.SUCCESS(f"Wrote {options['json_path']}"))
+
+    def _run(self, users, duration, iterations):
+        barrier = threading.Barrier(len(users) + 1)
+        deadline = time.monotonic() + duration if duration else math.inf
+        threads = [
+            threading.Thread(target=user.run, args=(deadline, iterations, barrier), daemon=True)
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def _report(self, users, elapsed, options, flows):
+        merged = defaultdict(list)
+        for user in users:
+            for flow, samples in user.results.items():
+                merged[flow].extend(samples)
+
+        # The dashboard page fans out into one dashboard_widget call per widget
+        reported = [flow for flow in (*FLOWS, "dashboard_widget") if flow in flows or flow in merged]
+        report_flows = {}
+        for flow in reported:
+            samples = merged.get(flow, [])
+            latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+            queries = [count for _, count, _ in samples]
+            errors = Counter(error for _, _, error in samples if error)
+            report_flows[flow] = {
+                "requests": len(samples),
+                "errors": sum(errors.values()),
+                "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+                "p50_ms": _round(percentile(latencies, 50)),
+                "p95_ms": _round(percentile(latencies, 95)),
+                "p99_ms": _round(percentile(latencies, 99)),
+                "max_ms": _round(latencies[-1] if latencies else None),
+                "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+                "error_types": dict(errors.most_common(5)),
+            }
+
+        total = sum(flow["requests"] for flow in report_flows.values())
+        return {
+            "started_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "options": {
+                "users": options["users"],
+                "duration": options["duration"],
+                "iterations": options["iterations"],
+                "gateway_latency_ms": options["gateway_latency"],
+                "seed": options["seed"],
+            },
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(flow["errors"] for flow in report_flows.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "flows": report_flows,
+        }
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']}s "
+            f"({report['throughput_rps']} req/s, {report['errors']} errors)\n"
+        )
+        header = f"{'flow':18} {'reqs':>6} {'errors':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}"
+        self.stdout.write(header)
+        for name, flow in report["flows"].items():
+            self.stdout.write(
+                f"{name:18} {flow['requests']:>6} {flow['errors']:>6} {flow['throughput_rps'] or 0:>7} "
+                f"{_fmt(flow['p50_ms'])} {_fmt(flow['p95_ms'])} {_fmt(flow['p99_ms'])} "
+                f"{flow['queries_per_request'] if flow['queries_per_request'] is not None else '-':>8}"
+            )
+        for name, flow in report["flows"].items():
+            for error, count in flow["error_types"].items():
+                self.stderr.write(f"{name}: {count} x {error}")
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _fmt(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
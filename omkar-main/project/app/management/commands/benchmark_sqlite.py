@@ -0,0 +1,239 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from app.management.commands.benchmark import _fmt, _round, percentile
+
+# The shape of reserve_booking(): read the nights already booked, then insert
+SCHEMA = """
+CREATE TABLE bench_booking (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resort_id INTEGER NOT NULL,
+    check_in INTEGER NOT NULL,
+    guests INTEGER NOT NULL,
+    payload TEXT NOT NULL
+)
+"""
+INDEX = "CREATE INDEX bench_booking_resort ON bench_booking (resort_id, check_in)"
+AVAILABILITY = "SELECT COALESCE(SUM(guests), 0) FROM bench_booking WHERE resort_id = %s AND check_in = %s"
+INSERT = "INSERT INTO bench_booking (resort_id, check_in, guests, payload) VALUES (%s, %s, %s, %s)"
+READ = "SELECT resort_id, COUNT(*), SUM(guests) FROM bench_booking WHERE check_in >= %s GROUP BY resort_id"
+
+RESORTS = 50
+DAYS = 365
+
+
+def _default_options():
+    """The backend's own defaults: rollback journal, deferred transactions, 5s timeout."""
+    return {}
+
+
+def _tuned_options():
+    """
+    The DATABASES options with WAL switched on, as SQLITE_WAL=1 would; the
+    scratch file is thrown away, so its header does not matter.
+    """
+    options = dict(settings.DATABASES["default"].get("OPTIONS", {}))
+    init_command = options.get("init_command", "")
+    if "journal_mode" not in init_command:
+        options["init_command"] = "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;" + init_command
+    return options
+
+
+MODES = {"default": _default_options, "tuned": _tuned_options}
+
+
+class Worker:
+    """One thread on its own connection, either booking or browsing until the deadline."""
+
+    def __init__(self, alias, writer, rng):
+        self.alias = alias
+        self.writer = writer
+        self.rng = rng
+        self.latencies = []
+        self.errors = Counter()
+
+    def step(self):
+        rng = self.rng
+        if self.writer:
+            with transaction.atomic(using=self.alias), connections[self.alias].cursor() as cursor:
+                resort, day = rng.randrange(RESORTS), rng.randrange(DAYS)
+                cursor.execute(AVAILABILITY, [resort, day])
+                booked = cursor.fetchone()[0]
+                cursor.execute(INSERT, [resort, day, rng.randint(1, 4), f"booked after {booked}"])
+        else:
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute(READ, [rng.randrange(DAYS)])
+                cursor.fetchall()
+
+    def run(self, deadline, start_barrier):
+        try:
+            start_barrier.wait()
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    self.step()
+                except OperationalError as e:
+                    self.errors[str(e)] += 1
+                else:
+                    self.latencies.append(time.perf_counter() - start)
+        finally:
+            connections[self.alias].close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite's default connection settings with the tuned DATABASES options "
+        "under concurrent writers and readers, each on a scratch database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8, help="Concurrent writing threads (default: 8).")
+        parser.add_argument("--readers", type=int, default=8, help="Concurrent reading threads (default: 8).")
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per mode (default: 10).")
+        parser.add_argument(
+            "--modes", default=",".join(MODES), help=f"Comma-separated subset of: {', '.join(MODES)}.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", dest="json_path", help="Write the results as JSON to this file, '-' for stdout.")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES["default"]["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("The default database is not SQLite.")
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}.")
+        if options["writers"] < 1 or options["readers"] < 0:
+            raise CommandError("--writers must be at least 1, --readers at least 0.")
+
+        results = {}
+        for mode in modes:
+            results[mode] = self._run_mode(mode, MODES[mode](), options)
+
+        report = {
+            "started_at": timezone.now().isoformat(),
+            "sqlite_version": connections["default"].Database.sqlite_version,
+            "options": {
+                "writers": options["writers"],
+                "readers": options["readers"],
+                "duration": options["duration"],
+                "seed": options["seed"],
+            },
+            "modes": results,
+        }
+        if "default" in results and "tuned" in results and results["default"]["writes_per_s"]:
+            report["write_gain"] = round(results["tuned"]["writes_per_s"] / results["default"]["writes_per_s"], 2)
+
+        self._print(report)
+        if options["json_path"]:
+            text = json.dumps(report, indent=2)
+            if options["json_path"] == "-":
+                self.stdout.write(text)
+            else:
+                with open(options["json_path"], "w", encoding="utf-8") as f:
+                    f.write(text + "\n")
+                self.stdout.write(self.style.SUCCESS(f"Wrote {options['json_path']}"))
+
+    def _run_mode(self, mode, db_options, options):
+        directory = tempfile.mkdtemp(prefix="benchmark-sqlite-")
+        path = os.path.join(directory, f"{mode}.sqlite3")
+        alias = f"benchmark_sqlite_{mode}"
+        connections.settings[alias] = {
+            **connections.settings["default"],
+            "NAME": path,
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": db_options,
+            "TEST": {},
+        }
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(SCHEMA)
+                cursor.execute(INDEX)
+                cursor.execute("PRAGMA journal_mode")
+                journal = cursor.fetchone()[0]
+            connections[alias].close()
+
+            rng = random.Random(options["seed"])
+            workers = [Worker(alias, True, random.Random(rng.random())) for _ in range(options["writers"])]
+            workers += [Worker(alias, False, random.Random(rng.random())) for _ in range(options["readers"])]
+            elapsed = self._run(workers, options["duration"])
+        finally:
+            connections[alias].close()
+            del connections.settings[alias]
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+            os.rmdir(directory)
+
+        return {
+            "journal_mode": journal,
+            "transaction_mode": db_options.get("transaction_mode") or "DEFERRED",
+            **self._summarize([w for w in workers if w.writer], elapsed, "writes"),
+            **self._summarize([w for w in workers if not w.writer], elapsed, "reads"),
+        }
+
+    def _run(self, workers, duration):
+        barrier = threading.Barrier(len(workers) + 1)
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=worker.run, args=(deadline, barrier), daemon=True)
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def _summarize(self, workers, elapsed, kind):
+        latencies = sorted(seconds * 1000 for worker in workers for seconds in worker.latencies)
+        errors = Counter()
+        for worker in workers:
+            errors.update(worker.errors)
+        return {
+            kind: len(latencies),
+            f"{kind}_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+            f"{kind}_errors": sum(errors.values()),
+            f"{kind}_p50_ms": _round(percentile(latencies, 50)),
+            f"{kind}_p95_ms": _round(percentile(latencies, 95)),
+            f"{kind}_p99_ms": _round(percentile(latencies, 99)),
+            f"{kind}_error_types": dict(errors.most_common(5)),
+        }
+
+    def _print(self, report):
+        opts = report["options"]
+        self.stdout.write(
+            f"SQLite {report['sqlite_version']}, {opts['writers']} writers and "
+            f"{opts['readers']} readers for {opts['duration']}s per mode\n"
+        )
+        header = (
+            f"{'mode':8} {'journal':>8} {'writes/s':>9} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8}"
+            f" {'reads/s':>9} {'errors':>7}"
+        )
+        self.stdout.write(header)
+        for name, mode in report["modes"].items():
+            self.stdout.write(
+                f"{name:8} {mode['journal_mode']:>8} {mode['writes_per_s']:>9} {mode['writes_errors']:>7} "
+                f"{_fmt(mode['writes_p50_ms'])} {_fmt(mode['writes_p95_ms'])} {_fmt(mode['writes_p99_ms'])} "
+                f"{mode['reads_per_s'] if mode['reads_per_s'] is not None else '-':>9} {mode['reads_errors']:>7}"
+            )
+        if "write_gain" in report:
+            self.stdout.write(self.style.SUCCESS(f"\nTuned writes: {report['write_gain']}x the default throughput"))
+        for name, mode in report["modes"].items():
+            for kind in ("writes", "reads"):
+                for error, count in mode[f"{kind}_error_types"].items():
+                    self.stderr.write(f"{name} {kind}: {count} x {error}")
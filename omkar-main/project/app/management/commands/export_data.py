@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app.exports import DATASETS, FORMATS, export_filename, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream bookings, payments or guests to a CSV or JSON Lines file, e.g. for nightly finance dumps."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", dest="fmt", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--status", help="Booking status, e.g. Pending, Paid or Cancelled.")
+        parser.add_argument("--payment-status", help="Payment status, e.g. Pending, Paid or Refunded.")
+        parser.add_argument(
+            "--output", "-o",
+            help="File to write; '-' for stdout. Defaults to <dataset>_<from>_<to>.<format>.",
+        )
+
+    def _date(self, value, option):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-02-30
+            day = None
+        if not day:
+            raise CommandError(f"{option} must be a valid date.")
+        return day
+
+    def handle(self, *args, **options):
+        date_from = self._date(options["date_from"], "--from")
+        date_to = self._date(options["date_to"], "--to")
+        if date_from and date_to and date_from > date_to:
+            raise CommandError("--from must not be after --to.")
+
+        fmt = options["fmt"]
+        lines = stream_export(
+            options["dataset"],
+            fmt,
+            date_from=date_from,
+            date_to=date_to,
+            status=options["status"],
+            payment_status=options["payment_status"],
+        )
+
+        output = options["output"] or export_filename(options["dataset"], fmt, date_from, date_to)
+        if output == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        count = -1 if fmt == "csv" else 0   # don't count the CSV header
+        with open(output, "w", newline="", encoding="utf-8") as fp:
+            for line in lines:
+                fp.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f"Wrote {count} rows to {output}"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from app.images import generate_variants, variant_widths
+from app.models import Blog, GalleryImage, Offer, Resort
+
+IMAGE_MODELS = (Resort, GalleryImage, Blog, Offer)
+
+
+class Command(BaseCommand):
+    help = "Generate responsive WebP/JPEG variants for images uploaded before the pipeline existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate variants that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in IMAGE_MODELS:
+            names.update(
+                model.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True)
+            )
+
+        done = failed = 0
+        for name in sorted(names):
+            if not options["force"] and variant_widths(name):
+                continue
+            try:
+                generate_variants(name)
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f"Skipped {name}: {e}")
+                continue
+            done += 1
+            self.stdout.write(f"Generated variants for {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {done} images, {failed} skipped."))
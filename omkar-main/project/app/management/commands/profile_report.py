@@ -0,0 +1,95 @@
+import io
+import pstats
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.profiling import COLLAPSED_SUFFIX, PROFILE_SUFFIX, parse_file_name, profile_dir, read_collapsed
+
+
+class Command(BaseCommand):
+    help = "Aggregate the profiles written by ProfilingMiddleware, overall or for one view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Profile directory (default: PROFILING_DIR).")
+        parser.add_argument("--view", help="Only profiles of this URL name, e.g. book_resort.")
+        parser.add_argument("--limit", type=int, default=25, help="Rows per table (default: 25).")
+        parser.add_argument(
+            "--sort", choices=["cumulative", "tottime", "calls"], default="cumulative",
+            help="Order of the cProfile table (default: cumulative).",
+        )
+        parser.add_argument(
+            "--collapsed-out",
+            help="Also write the merged sampled stacks here, ready for flamegraph.pl or speedscope.",
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options["dir"]) if options["dir"] else profile_dir()
+        if not directory.is_dir():
+            raise CommandError(f"No profiles in {directory}.")
+
+        files = defaultdict(list)
+        durations = defaultdict(list)
+        for path in sorted(directory.iterdir()):
+            if path.suffix not in (PROFILE_SUFFIX, COLLAPSED_SUFFIX):
+                continue
+            view, ms = parse_file_name(path)
+            if view is None or (options["view"] and view != options["view"]):
+                continue
+            files[path.suffix].append(path)
+            durations[view].append(ms)
+
+        if not durations:
+            raise CommandError("No matching profiles.")
+
+        self._summary(durations)
+        if files[PROFILE_SUFFIX]:
+            self._profiles(files[PROFILE_SUFFIX], options["sort"], options["limit"])
+        if files[COLLAPSED_SUFFIX]:
+            self._stacks(files[COLLAPSED_SUFFIX], options["limit"], options["collapsed_out"])
+
+    def _summary(self, durations):
+        self.stdout.write(self.style.MIGRATE_HEADING("Profiled requests by view"))
+        self.stdout.write(f"{'view':40} {'count':>6} {'median ms':>10} {'max ms':>8}")
+        for view, values in sorted(durations.items(), key=lambda item: -max(item[1])):
+            values.sort()
+            self.stdout.write(f"{view:40} {len(values):>6} {values[len(values) // 2]:>10} {values[-1]:>8}")
+
+    def _profiles(self, paths, sort, limit):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\ncProfile, {len(paths)} sampled requests"))
+        buffer = io.StringIO()
+        stats = pstats.Stats(*map(str, paths), stream=buffer)
+        stats.files = []  # Skip the list of input files; there can be hundreds
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(buffer.getvalue())
+
+    def _stacks(self, paths, limit, out):
+        stacks = Counter()
+        for path in paths:
+            stacks.update(read_collapsed(path))
+        total = sum(stacks.values())
+
+        # Self time is where the innermost frame was; inclusive counts every frame on the stack once
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        # Middleware and handler frames sit under every sample and say nothing
+        inclusive = Counter({frame: count for frame, count in inclusive.items() if count < total})
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nSampled stacks, {len(paths)} slow requests, {total} samples"
+        ))
+        for title, counter in (("self", own), ("inclusive", inclusive)):
+            self.stdout.write(f"\n{'% ' + title:>12}  frame")
+            for frame, count in counter.most_common(limit):
+                self.stdout.write(f"{100 * count / total:>11.1f}%  {frame}")
+
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.stdout.write(self.style.SUCCESS(f"\nWrote merged stacks to {out}"))
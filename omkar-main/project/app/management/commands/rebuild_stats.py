@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-resort daily booking rollups that back the admin dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since", help="YYYY-MM-DD. Only rebuild days from this date on (default: everything).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_date(options["since"])
+            except ValueError:
+                # Well-formed but impossible, e.g. 2024-02-30
+                since = None
+            if not since:
+                raise CommandError("--since must be a valid date.")
+
+        count = rebuild_stats(since)
+        self.stdout.write(self.style.SUCCESS(f"Done: {count} daily rollups."))
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date
+
+from app.models import Booking
+from app.receipts import render_receipts
+
+
+def _init_worker():
+    if not apps.ready:  # spawn/forkserver start methods
+        django.setup()
+    # Never share the parent's database connections with a child process
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Render (and cache) receipt PDFs for bookings created in a date range, in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD, inclusive.")
+        parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD, inclusive.")
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Size of the process pool (default: number of CPUs).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=100, help="Bookings per task.")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = parse_date(options["date_from"])
+            date_to = parse_date(options["date_to"])
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-02-30
+            date_from = date_to = None
+        if not date_from or not date_to or date_from > date_to:
+            raise CommandError("--from and --to must be valid dates with --from <= --to.")
+
+        booking_ids = list(
+            Booking.objects.filter(created_at__date__range=(date_from, date_to))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if not booking_ids:
+            self.stdout.write("No bookings in range.")
+            return
+
+        size = options["chunk_size"]
+        chunks = [booking_ids[i:i + size] for i in range(0, len(booking_ids), size)]
+
+        connections.close_all()
+        done = 0
+        with ProcessPoolExecutor(max_workers=options["processes"], initializer=_init_worker) as pool:
+            for future in as_completed(pool.submit(render_receipts, chunk) for chunk in chunks):
+                done += future.result()
+                self.stdout.write(f"Rendered {done}/{len(booking_ids)} receipts")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {done} receipts."))
@@ -0,0 +1,55 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (emails, QR codes, PDFs) until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Number of worker threads.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--burst", action="store_true",
+            help="Exit once there are no due jobs left instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping workers after current jobs...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        jobs.requeue_stale()
+        threads = [
+            threading.Thread(
+                target=jobs.work,
+                kwargs={
+                    "stop_event": stop_event,
+                    "poll_interval": options["poll_interval"],
+                    "burst": options["burst"],
+                },
+                name=f"job-worker-{i}",
+            )
+            for i in range(options["workers"])
+        ]
+        for thread in threads:
+            thread.start()
+
+        self.stdout.write(f"Started {len(threads)} worker(s).")
+        # join() with a timeout keeps the main thread responsive to signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
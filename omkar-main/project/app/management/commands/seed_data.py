@@ -0,0 +1,178 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from app.caching import bump_page_version
+from app.models import Booking, Guest, Payment, Resort, Wishlist
+from app.search import rebuild_index
+from app.stats import rebuild_stats
+
+BATCH_SIZE = 1000
+
+# Seeded accounts all share this password, so benchmarks and testers can sign in
+SEED_PASSWORD = "seed-password"
+
+PLACES = [
+    ("Goa", 15.30, 74.00),
+    ("Lonavala", 18.75, 73.41),
+    ("Alibaug", 18.64, 72.87),
+    ("Munnar", 10.09, 77.06),
+    ("Coorg", 12.34, 75.81),
+    ("Udaipur", 24.58, 73.71),
+    ("Rishikesh", 30.09, 78.27),
+    ("Mahabaleshwar", 17.92, 73.66),
+]
+KINDS = ["Beach", "Lake", "Hill", "Forest", "Palace", "River", "Valley", "Spa"]
+AMENITIES = ["Pool", "WiFi", "Spa", "Gym", "Restaurant", "Bar", "Parking", "Kids Club", "Yoga", "Bonfire"]
+FIRST_NAMES = ["Aarav", "Diya", "Kabir", "Meera", "Rohan", "Sara", "Vikram", "Anaya", "Arjun", "Isha"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Khan", "Desai", "Nair", "Gupta", "Rao", "Joshi", "Mehta"]
+
+
+class Command(BaseCommand):
+    help = "Create realistic volumes of resorts, users, bookings, payments and guests for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resorts", type=int, default=50)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--bookings", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed builds the same data.")
+
+    def handle(self, *args, **options):
+        if min(options["resorts"], options["users"]) < 1 or options["bookings"] < 0:
+            raise CommandError("--resorts and --users must be at least 1, --bookings at least 0.")
+        self.rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            resorts = self._resorts(options["resorts"])
+            users = self._users(options["users"])
+            bookings = self._bookings(options["bookings"], resorts, users)
+            self._wishlists(users, resorts)
+
+        # bulk_create skips the signals that keep these up to date
+        rebuild_index()
+        days = rebuild_stats()
+        bump_page_version("resorts")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {len(resorts)} resorts, {len(users)} users, {bookings} bookings, {days} daily rollups. "
+            f"Seeded users sign in with password {SEED_PASSWORD!r}."
+        ))
+
+    def _resorts(self, count):
+        rng = self.rng
+        resorts = []
+        offset = Resort.objects.count()
+        for i in range(count):
+            place, lat, lng = rng.choice(PLACES)
+            kind = rng.choice(KINDS)
+            resorts.append(Resort(
+                name=f"{place} {kind} Resort {offset + i + 1}",
+                location=place,
+                description=f"A {kind.lower()} resort near {place} with {rng.randint(10, 80)} rooms.",
+                amenities=", ".join(rng.sample(AMENITIES, rng.randint(3, 7))),
+                highlights=f"{kind} views, local cuisine",
+                price_per_guest=Decimal(rng.randrange(800, 9000, 50)),
+                latitude=lat + rng.uniform(-0.3, 0.3),
+                longitude=lng + rng.uniform(-0.3, 0.3),
+                capacity=rng.choice([40, 60, 100, 150, 200]),
+            ))
+        return Resort.objects.bulk_create(resorts, batch_size=BATCH_SIZE)
+
+    def _users(self, count):
+        User = get_user_model()
+        rng = self.rng
+        # Hashing is deliberately slow; every seeded user shares one hash
+        password = make_password(SEED_PASSWORD)
+        offset = User.objects.filter(email__startswith="seed-").count()
+        users = []
+        for i in range(offset, offset + count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(
+                email=f"seed-{i}@example.com",
+                phone=f"+0{i:012d}",
+                name=f"{first} {last}",
+                first_name=first,
+                last_name=last,
+                password=password,
+            ))
+        return User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+    def _bookings(self, count, resorts, users):
+        rng = self.rng
+        now = timezone.now()
+        today = timezone.localdate()
+        created = 0
+        for start in range(0, count, BATCH_SIZE):
+            batch, created_at = [], []
+            for _ in range(min(BATCH_SIZE, count - start)):
+                resort, user = rng.choice(resorts), rng.choice(users)
+                check_in = today + timedelta(days=rng.randint(-365, 120))
+                nights = rng.choice([1, 1, 2, 2, 3, 4, 7])
+                guests = rng.choice([1, 2, 2, 2, 3, 4, 6])
+                total = resort.price_per_guest * guests * nights
+                advance = Decimal(guests * 50)
+                payment_status = rng.choices(["Paid", "Pending", "Refunded"], [75, 20, 5])[0]
+                booking_status = "Cancelled" if payment_status == "Refunded" or rng.random() < 0.03 else "Pending"
+                batch.append(Booking(
+                    user=user,
+                    resort=resort,
+                    guest_name=user.name,
+                    guest_email=user.email,
+                    guest_phone=user.phone,
+                    check_in=check_in,
+                    check_out=check_in + timedelta(days=nights),
+                    guests=guests,
+                    total_price=total,
+                    advance_paid=advance,
+                    pending_amount=total - advance,
+                    payment_status=payment_status,
+                    booking_status=booking_status,
+                ))
+                # Booked one to sixty days ahead of the stay, never in the future
+                booked = datetime.combine(check_in - timedelta(days=rng.randint(1, 60)), time(rng.randint(0, 23)))
+                created_at.append(min(timezone.make_aware(booked), now))
+
+            batch = Booking.objects.bulk_create(batch)
+            # auto_now_add overwrites created_at on insert; spread it out afterwards
+            for booking, when in zip(batch, created_at):
+                booking.created_at = when
+            Booking.objects.bulk_update(batch, ["created_at"], batch_size=BATCH_SIZE)
+
+            self._payments_and_guests(batch)
+            created += len(batch)
+        return created
+
+    def _payments_and_guests(self, bookings):
+        rng = self.rng
+        payments, guests = [], []
+        for booking in bookings:
+            if booking.payment_status in ("Paid", "Refunded"):
+                refunded = booking.payment_status == "Refunded"
+                payments.append(Payment(
+                    booking=booking,
+                    payment_id=f"pay_seed_{booking.id}",
+                    payment_method=rng.choice(["UPI", "Card", "Netbanking"]),
+                    amount_paid=booking.advance_paid,
+                    refunded=refunded,
+                    refund_amount=booking.advance_paid if refunded else None,
+                    refund_date=booking.created_at if refunded else None,
+                ))
+            for n in range(booking.guests):
+                guests.append(Guest(booking=booking, full_name=f"{booking.guest_name} {n + 1}", age=rng.randint(4, 75)))
+        Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+        Guest.objects.bulk_create(guests, batch_size=BATCH_SIZE)
+
+    def _wishlists(self, users, resorts):
+        rng = self.rng
+        items = [
+            Wishlist(user=user, resort=resort)
+            for user in users
+            for resort in rng.sample(resorts, min(len(resorts), rng.randint(0, 5)))
+        ]
+        Wishlist.objects.bulk_create(items, batch_size=BATCH_SIZE)
@@ -0,0 +1,121 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Under a multi-process server (gunicorn, uwsgi) set PROMETHEUS_MULTIPROC_DIR
+to an empty, writable directory before the workers start. Every process
+then writes its samples there and the view merges them, so a scrape sees
+the whole server rather than whichever worker answered it. Remove dead
+workers' files from the gunicorn ``child_exit`` hook with
+``prometheus_client.multiprocess.mark_process_dead(worker.pid)``.
+"""
+import hmac
+import os
+
+from django.conf import settings
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    "app_request_duration_seconds",
+    "Request latency by URL name",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "app_requests",
+    "Requests by URL name and response status",
+    ["view", "method", "status"],
+)
+
+BOOKINGS = Counter("app_bookings", "Bookings entering a booking status", ["status"])
+PAYMENTS = Counter("app_payments", "Bookings entering a payment status", ["status"])
+REFUNDS = Counter("app_refunds", "Refund requests by outcome", ["status"])
+
+# Razorpay, SMTP and other calls leaving the process, timed by instrumentation.track()
+EXTERNAL_LATENCY = Histogram(
+    "app_external_call_duration_seconds",
+    "Outbound call latency",
+    ["service", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+EXTERNAL_ERRORS = Counter(
+    "app_external_call_errors",
+    "Outbound calls that raised",
+    ["service", "operation"],
+)
+
+# Label for requests that did not match any URL pattern
+UNRESOLVED = "<unresolved>"
+
+# Finished jobs are left out: their count only ever grows
+QUEUE_STATUSES = ("queued", "running", "failed")
+
+
+def observe_request(view, method, status, seconds):
+    view = view or UNRESOLVED
+    REQUEST_LATENCY.labels(view, method).observe(seconds)
+    REQUESTS.labels(view, method, str(status)).inc()
+
+
+def observe_external(service, operation, seconds, failed=False):
+    EXTERNAL_LATENCY.labels(service, operation).observe(seconds)
+    if failed:
+        EXTERNAL_ERRORS.labels(service, operation).inc()
+
+
+class JobQueueCollector:
+    """Read the job queue at scrape time, so every process reports the same numbers."""
+
+    def collect(self):
+        from django.db.models import Count, Min
+        from django.utils import timezone
+
+        from .models import Job
+
+        depth = GaugeMetricFamily("app_job_queue_depth", "Background jobs by status", labels=["status"])
+        counts = dict(
+            Job.objects.filter(status__in=QUEUE_STATUSES)
+            .values_list("status")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for status in QUEUE_STATUSES:
+            depth.add_metric([status], counts.get(status, 0))
+        yield depth
+
+        oldest = Job.objects.filter(status="queued", run_at__lte=timezone.now()).aggregate(
+            oldest=Min("run_at")
+        )["oldest"]
+        lag = (timezone.now() - oldest).total_seconds() if oldest else 0
+        yield GaugeMetricFamily(
+            "app_job_queue_lag_seconds", "How long the oldest due job has been waiting", value=lag
+        )
+
+
+_queue_registry = CollectorRegistry(auto_describe=False)
+_queue_registry.register(JobQueueCollector())
+
+
+def scrape_allowed(request):
+    """With ``METRICS_TOKEN`` set, scrapers must send it as a bearer token."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        return True
+    header = request.headers.get("Authorization", "")
+    return hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+
+
+def latest():
+    """The exposition text for every process of this server."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(_queue_registry)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_alter_customuser_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resort',
+            name='capacity',
+            field=models.PositiveIntegerField(default=100),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['resort', 'check_in', 'check_out'], name='booking_resort_stay_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_booking_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='razorpay_order_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='razorpay_order_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
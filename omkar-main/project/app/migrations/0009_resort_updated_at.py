@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0008_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resort",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:38
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_resort_fts USING fts5(
+        name, location, description, amenities, highlights,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO app_resort_fts (rowid, name, location, description, amenities, highlights)
+    SELECT id, name, location, description, amenities, highlights FROM app_resort
+    """,
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS app_resort_fts"]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE app_resort ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(amenities, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(highlights, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX app_resort_search_gin ON app_resort USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS app_resort_search_gin",
+    "ALTER TABLE app_resort DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_resort_updated_at"),
+    ]
+
+    operations = [
+        # Full-text index over the searchable Resort columns. SQLite keeps a
+        # separate FTS5 table (synced by app.signals); Postgres uses a
+        # generated tsvector column with a GIN index.
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
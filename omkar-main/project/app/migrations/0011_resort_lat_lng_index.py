@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0010_resort_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="resort",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="resort_lat_lng_idx"
+            ),
+        ),
+    ]
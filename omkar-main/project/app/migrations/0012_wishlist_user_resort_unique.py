@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:43
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_wishlist_rows(apps, schema_editor):
+    Wishlist = apps.get_model("app", "Wishlist")
+    keep = (
+        Wishlist.objects.values("user", "resort")
+        .annotate(keep_id=Min("id"))
+        .values_list("keep_id", flat=True)
+    )
+    Wishlist.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0011_resort_lat_lng_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_wishlist_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="wishlist",
+            constraint=models.UniqueConstraint(
+                fields=("user", "resort"), name="wishlist_user_resort_unique"
+            ),
+        ),
+    ]
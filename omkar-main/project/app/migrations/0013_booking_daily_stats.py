@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0012_wishlist_user_resort_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("bookings", models.PositiveIntegerField(default=0)),
+                ("paid_bookings", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["resort", "created_at"], name="booking_resort_created_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookingdailystats",
+            name="resort",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="daily_stats",
+                to="app.resort",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookingdailystats",
+            index=models.Index(fields=["day"], name="booking_stats_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="bookingdailystats",
+            constraint=models.UniqueConstraint(
+                fields=("resort", "day"), name="booking_stats_resort_day_unique"
+            ),
+        ),
+    ]
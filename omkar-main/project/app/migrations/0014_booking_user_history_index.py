@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0013_booking_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["user", "-id"], name="booking_user_history_idx"),
+        ),
+    ]
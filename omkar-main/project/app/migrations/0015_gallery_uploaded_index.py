@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0014_booking_user_history_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="galleryimage",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="gallery_uploaded_idx"
+            ),
+        ),
+    ]
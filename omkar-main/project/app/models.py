@@ -1,10 +1,63 @@
 from django.db import models
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 # from django.contrib.auth.models import User
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
 
+
+def _active_booking_q():
+    """Bookings that still hold inventory (not cancelled and not refunded)."""
+    return ~Q(booking_status="Cancelled") & ~Q(payment_status="Refunded")
+
+
+def _overlap_q(check_in, check_out):
+    """Stays that share at least one night with [check_in, check_out)."""
+    return Q(check_in__lt=check_out, check_out__gt=check_in)
+
+
+def _peak_guests(check_in, check_out):
+    """
+    Most guests booked on any single night of [check_in, check_out), for the
+    resort in the outer query.
+
+    Occupancy only rises on a night some booking starts, so the peak is the
+    busiest of those nights within the stay (or the first night of the stay).
+    Two stays that overlap the request but not each other are not added up.
+    """
+    overlapping = (
+        Booking.objects.filter(resort=OuterRef("pk"))
+        .active()
+        .overlapping(check_in, check_out)
+        .annotate(night=Greatest("check_in", Value(check_in, output_field=models.DateField())))
+    )
+    load = (
+        Booking.objects.filter(resort=OuterRef("resort"), check_in__lte=OuterRef("night"), check_out__gt=OuterRef("night"))
+        .active()
+        .order_by()
+        .values("resort")
+        .annotate(total=Sum("guests"))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(overlapping.annotate(load=Subquery(load)).order_by("-load").values("load")[:1]),
+        0,
+    )
+
+
+class ResortQuerySet(models.QuerySet):
+    def with_booked_guests(self, check_in, check_out):
+        return self.annotate(booked_guests=_peak_guests(check_in, check_out))
+
+    def available(self, check_in, check_out, guests=1):
+        """Resorts with room for ``guests`` more people on every night of the stay."""
+        return self.with_booked_guests(check_in, check_out).filter(
+            capacity__gte=F("booked_guests") + guests
+        )
+
+
 class Resort(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=255)
@@ -22,16 +75,49 @@ class Resort(models.Model):
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
 
+    # Inventory: how many guests the resort can host on any single night
+    capacity = models.PositiveIntegerField(default=100)
+
+    # Bumped on every save; drives the catalog version used by /api/resorts/
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ResortQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for "near me" searches (see app.geo)
+            models.Index(fields=["latitude", "longitude"], name="resort_lat_lng_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def booked_guests(self, check_in, check_out):
+        """Guests already booked on the busiest night of the stay."""
+        return (
+            Resort.objects.with_booked_guests(check_in, check_out)
+            .values_list("booked_guests", flat=True)
+            .get(pk=self.pk)
+        )
+
+    def is_available(self, check_in, check_out, guests=1):
+        return self.booked_guests(check_in, check_out) + guests <= self.capacity
+
 STATUS_CHOICES = [
     ('Pending', 'Pending'),
     ('Paid', 'Paid'),
     ('Cancelled', 'Cancelled'),
 ]
 
+
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(_active_booking_q())
+
+    def overlapping(self, check_in, check_out):
+        return self.filter(_overlap_q(check_in, check_out))
+
+
 class Booking(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -49,6 +135,8 @@ class Booking(models.Model):
     booking_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
     payment_status = models.CharField(max_length=10, default='Pending')
     razorpay_order_id = models.CharField(max_length=100, blank=True, null=True)
+    razorpay_order_amount = models.PositiveIntegerField(blank=True, null=True)   # paise
+    razorpay_order_created_at = models.DateTimeField(blank=True, null=True)
     
     # NEW FIELDS
     advance_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -56,9 +144,23 @@ class Booking(models.Model):
     
     qr_code = models.ImageField(upload_to="qr_codes/", blank=True, null=True)
     checkin_verified = models.BooleanField(default=False)
+
+    # Client-supplied key so retried submissions return the original booking
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Availability lookups: resort = X AND check_in < ? AND check_out > ?
+            models.Index(fields=["resort", "check_in", "check_out"], name="booking_resort_stay_idx"),
+            # Daily stats refresh: resort = X AND created_at in one day
+            models.Index(fields=["resort", "created_at"], name="booking_resort_created_idx"),
+            # Booking history: user = X ORDER BY id DESC, resumed from a cursor
+            models.Index(fields=["user", "-id"], name="booking_user_history_idx"),
+        ]
 
     def __str__(self):
         return f"{self.guest_name} - {self.resort.name}"
@@ -76,7 +178,7 @@ class Payment(models.Model):
 
 
     def __str__(self):
-        return f"Payment for Booking ID {self.booking.id}"
+        return f"Payment for Booking ID {self.booking_id}"
 
 class Guest(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='guest_list')
@@ -84,7 +186,7 @@ class Guest(models.Model):
     age = models.PositiveIntegerField()
 
     def __str__(self):
-        return f"{self.full_name} (Booking ID: {self.booking.id})"
+        return f"{self.full_name} (Booking ID: {self.booking_id})"
 
 
 class Blog(models.Model):
@@ -103,6 +205,12 @@ class GalleryImage(models.Model):
     image = models.ImageField(upload_to='gallery/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Gallery pages: ORDER BY uploaded_at DESC, id DESC from a cursor
+            models.Index(fields=["-uploaded_at", "-id"], name="gallery_uploaded_idx"),
+        ]
+
     def __str__(self):
         return self.title
 # models.py
@@ -119,12 +227,67 @@ class Wishlist(models.Model):
     resort = models.ForeignKey(Resort, on_delete=models.CASCADE)
     added_on = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "resort"], name="wishlist_user_resort_unique"),
+        ]
+
     def __str__(self):
         return f"{self.user} -> {self.resort.name}"
     
 
 
 
+JOB_STATUS_CHOICES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
+
+class Job(models.Model):
+    """Background work item picked up by ``manage.py run_workers``."""
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)   # higher runs first
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_at"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+class BookingDailyStats(models.Model):
+    """Per-resort, per-day booking totals kept up to date by app.stats."""
+    resort = models.ForeignKey(Resort, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    paid_bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)   # paid bookings only
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["resort", "day"], name="booking_stats_resort_day_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="booking_stats_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.resort} on {self.day}"
+
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, phone, password=None, **extra_fields):
         if not email:
@@ -171,4 +334,4 @@ class PasswordResetOTP(models.Model):
     is_used = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"OTP for {self.user.username} - {self.otp}"
\ No newline at end of file
+        return f"OTP for {self.user.email} - {self.otp}"
\ No newline at end of file
@@ -0,0 +1,84 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds DjangoJSONEncoder drops; a cursor rounded to the
+    millisecond would skip rows that sort just after it within that millisecond.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=_CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def paginate_keyset(queryset, ordering, cursor=None, limit=20):
+    """
+    Return ``(rows, next_cursor)`` for the page after ``cursor``.
+
+    ``ordering`` is a sequence such as ``("-uploaded_at", "-id")`` whose last
+    field must be unique. Each page is a range scan starting where the
+    previous one stopped, so deep pages cost the same as the first. For
+    ``.values()`` querysets the ordering fields must be among the selected
+    columns.
+    """
+    names = [field.lstrip("-") for field in ordering]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(names):
+            raise InvalidCursor("Cursor does not match ordering")
+        try:
+            values = [
+                queryset.model._meta.get_field(name).to_python(value)
+                for name, value in zip(names, values)
+            ]
+        except Exception:
+            raise InvalidCursor("Cursor does not match ordering")
+
+        # (a, b) after (x, y)  <=>  a > x OR (a = x AND b > y)
+        after = Q()
+        for i, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            clause = Q(**{f"{names[i]}__{lookup}": values[i]})
+            for j in range(i):
+                clause &= Q(**{names[j]: values[j]})
+            after |= clause
+        queryset = queryset.filter(after)
+
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([_value(rows[-1], name) for name in names])
+    return rows, next_cursor
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from functools import lru_cache
+
+import razorpay
+
+from django.conf import settings
+from django.utils import timezone
+
+from .instrumentation import track
+from .models import Booking
+
+
+@lru_cache(maxsize=None)
+def get_razorpay_client():
+    # One client (and its HTTP connection pool) per process
+    return razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+
+
+def _order_is_reusable(booking, amount_paise):
+    if not booking.razorpay_order_id or booking.razorpay_order_amount != amount_paise:
+        return False
+    if booking.razorpay_order_created_at is None:
+        return False
+    ttl = timedelta(seconds=getattr(settings, "RAZORPAY_ORDER_TTL", 24 * 60 * 60))
+    return timezone.now() - booking.razorpay_order_created_at < ttl
+
+
+def get_or_create_order(booking, amount_paise):
+    """
+    Return a Razorpay order id for collecting ``amount_paise`` on ``booking``.
+
+    The order stored on the booking is reused while it is younger than
+    ``RAZORPAY_ORDER_TTL`` and was created for the same amount; only then
+    does this call the gateway.
+    """
+    amount_paise = int(amount_paise)
+    if _order_is_reusable(booking, amount_paise):
+        return booking.razorpay_order_id
+
+    with track("razorpay", "order.create"):
+        order = get_razorpay_client().order.create(
+            {
+                "amount": amount_paise,
+                "currency": "INR",
+                "receipt": f"receipt_{booking.id}",
+                "payment_capture": 1,
+            }
+        )
+
+    booking.razorpay_order_id = order["id"]
+    booking.razorpay_order_amount = amount_paise
+    booking.razorpay_order_created_at = timezone.now()
+    Booking.objects.filter(pk=booking.pk).update(
+        razorpay_order_id=booking.razorpay_order_id,
+        razorpay_order_amount=booking.razorpay_order_amount,
+        razorpay_order_created_at=booking.razorpay_order_created_at,
+    )
+    return booking.razorpay_order_id
@@ -0,0 +1,184 @@
+"""
+Opt-in production profiling.
+
+With ``PROFILING_ENABLED`` on, ProfilingMiddleware runs cProfile on a random
+``PROFILING_SAMPLE_RATE`` of requests and writes ``.prof`` files (pstats).
+Every other request is watched by a stack sampler; those slower than
+``PROFILING_SLOW_MS`` are written as ``.collapsed`` files, one
+``frame;frame;frame count`` line per stack, which flamegraph.pl and
+speedscope read directly. ``manage.py profile_report`` aggregates both.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PROFILE_SUFFIX = ".prof"
+COLLAPSED_SUFFIX = ".collapsed"
+
+
+def profile_dir():
+    return Path(getattr(settings, "PROFILING_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """The stack ending at ``frame`` as ``outer;...;inner``."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    One background thread that snapshots the stacks of watched threads
+    every ``interval`` seconds. Cheap enough to leave on: it only touches
+    threads that are currently serving a request.
+    """
+
+    def __init__(self):
+        self.interval = 0.005
+        self._watched = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, interval):
+        with self._lock:
+            self.interval = interval
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def watch(self):
+        samples = Counter()
+        with self._lock:
+            self._watched[threading.get_ident()] = samples
+        return samples
+
+    def unwatch(self):
+        # Once this returns the samples are no longer written to
+        with self._lock:
+            self._watched.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._watched:
+                continue
+            with self._lock:
+                frames = sys._current_frames()
+                for ident, samples in self._watched.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[collapse(frame)] += 1
+            del frames
+
+
+# One sampler thread per process, shared by every middleware instance
+sampler = StackSampler()
+
+
+def _file_name(view, duration, suffix):
+    view = re.sub(r"[^\w.-]", "_", view or "unresolved")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return f"{stamp}-{os.getpid()}-{threading.get_ident() % 100000}-{view}-{round(duration * 1000)}ms{suffix}"
+
+
+def rotate(directory, keep):
+    """Delete the oldest profiles so at most ``keep`` remain."""
+    files = sorted(
+        (p for p in directory.iterdir() if p.suffix in (PROFILE_SUFFIX, COLLAPSED_SUFFIX)),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for path in files[:max(len(files) - keep, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def parse_file_name(path):
+    """``(view, duration_ms)`` from a profile file name."""
+    match = re.match(r"\d{8}-\d{6}-\d+-\d+-(?P<view>.+)-(?P<ms>\d+)ms$", Path(path).stem)
+    if not match:
+        return None, None
+    return match["view"], int(match["ms"])
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests, and every slow request, to ``PROFILING_DIR``."""
+
+    # cProfile cannot run in two threads at once on Python 3.12+
+    _cprofile_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.01)
+        self.slow = getattr(settings, "PROFILING_SLOW_MS", 1000) / 1000
+        self.keep = getattr(settings, "PROFILING_MAX_FILES", 500)
+        sampler.start(getattr(settings, "PROFILING_INTERVAL_MS", 5) / 1000)
+        profile_dir().mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, request):
+        if random.random() < self.sample_rate and self._cprofile_lock.acquire(blocking=False):
+            try:
+                return self._profile(request)
+            finally:
+                self._cprofile_lock.release()
+        return self._sample(request)
+
+    def _profile(self, request):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            self._write(request, time.perf_counter() - start, PROFILE_SUFFIX, profiler.dump_stats)
+
+    def _sample(self, request):
+        samples = sampler.watch()
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.unwatch()
+            duration = time.perf_counter() - start
+            if duration >= self.slow and samples:
+                self._write(request, duration, COLLAPSED_SUFFIX, lambda path: _write_collapsed(path, samples))
+
+    def _write(self, request, duration, suffix, write):
+        match = getattr(request, "resolver_match", None)
+        directory = profile_dir()
+        write(directory / _file_name(match.view_name if match else None, duration, suffix))
+        rotate(directory, self.keep)
+
+
+def _write_collapsed(path, samples):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def read_collapsed(path):
+    samples = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                samples[stack] += int(count)
+    return samples
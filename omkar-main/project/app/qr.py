@@ -0,0 +1,54 @@
+import hashlib
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+QR_CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+def qr_digest(payload):
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def qr_path(digest, fmt):
+    return f"qr_cache/{digest[:2]}/{digest}.{fmt}"
+
+
+def render_qr(payload, fmt):
+    if fmt == "svg":
+        img = qrcode.make(payload, image_factory=qrcode.image.svg.SvgPathImage)
+        buffer = BytesIO()
+        img.save(buffer)
+    else:
+        img = qrcode.make(payload)
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def get_qr(payload, fmt="png"):
+    """Return the storage path of the QR for ``payload``, rendering it only once."""
+    path = qr_path(qr_digest(payload), fmt)
+    if not default_storage.exists(path):
+        saved = default_storage.save(path, ContentFile(render_qr(payload, fmt)))
+        if saved != path:
+            # Another worker stored the same QR first; keep a single copy
+            default_storage.delete(saved)
+    return path
+
+
+def checkin_payload(request, booking):
+    return request.build_absolute_uri(reverse("verify_checkin", args=[booking.id]))
+
+
+def checkin_qr_url(request, booking, fmt="png"):
+    digest = qr_digest(checkin_payload(request, booking))
+    return reverse("booking_qr", args=[booking.id, digest, fmt])
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import zipfile
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Bump whenever draw_receipt() changes so cached PDFs are re-rendered
+RECEIPT_VERSION = 1
+
+# Booking fields printed on the receipt; saves touching only other fields
+# (e.g. checkin_verified) leave the cached PDF alone.
+RECEIPT_FIELDS = {
+    "guest_name", "guest_email", "guest_phone", "resort", "check_in",
+    "check_out", "guests", "advance_paid", "pending_amount", "qr_code",
+}
+
+
+def receipt_fingerprint(booking):
+    data = [
+        RECEIPT_VERSION,
+        booking.id,
+        booking.guest_name,
+        booking.guest_email,
+        booking.guest_phone,
+        booking.resort.name,
+        booking.check_in,
+        booking.check_out,
+        booking.guests,
+        booking.advance_paid,
+        booking.pending_amount,
+        booking.qr_code.name if booking.qr_code else "",
+    ]
+    return hashlib.sha256(json.dumps(data, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def _receipt_dir(booking_id):
+    return f"receipts/{booking_id}"
+
+
+def receipt_path(booking, fingerprint=None):
+    return f"{_receipt_dir(booking.id)}/{fingerprint or receipt_fingerprint(booking)}.pdf"
+
+
+def draw_receipt(booking, fp):
+    p = canvas.Canvas(fp, pagesize=A4)
+    width, height = A4
+
+    y = height - 60
+
+    # Logo (optional)
+    logo_path = os.path.join(settings.BASE_DIR, "static", "images", "logo.png")
+    if os.path.exists(logo_path):
+        p.drawImage(logo_path, 40, y - 80, width=120, preserveAspectRatio=True)
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(180, y - 40, "Manthan Resorts")
+    p.setFont("Helvetica", 11)
+    p.drawString(180, y - 60, "Premium Resort Booking Receipt")
+
+    y -= 120
+    p.line(40, y, width - 40, y)
+    y -= 30
+
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(40, y, "Booking Receipt")
+    y -= 30
+
+    p.setFont("Helvetica-Bold", 13)
+    p.drawString(40, y, f"Booking ID: #{booking.id}")
+    y -= 25
+
+    # Guest details
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Guest Information")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    p.drawString(40, y, f"Name: {booking.guest_name}")
+    y -= 18
+    p.drawString(40, y, f"Email: {booking.guest_email}")
+    y -= 18
+    p.drawString(40, y, f"Phone: {booking.guest_phone}")
+    y -= 32
+
+    # Stay details
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Stay Details")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    p.drawString(40, y, f"Resort: {booking.resort.name}")
+    y -= 18
+    p.drawString(40, y, f"Check-in: {booking.check_in}")
+    y -= 18
+    p.drawString(40, y, f"Check-out: {booking.check_out}")
+    y -= 18
+    p.drawString(40, y, f"Guests: {booking.guests}")
+    y -= 32
+
+    # Payment summary
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Payment Summary")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    p.drawString(40, y, f"Advance Paid: ₹{booking.advance_paid}")
+    y -= 18
+    p.drawString(40, y, f"Pending at Check-in: ₹{booking.pending_amount}")
+    y -= 25
+
+    y_space_for_qr = y
+
+    if booking.qr_code and os.path.exists(booking.qr_code.path):
+        p.drawImage(
+            booking.qr_code.path, width - 200, y_space_for_qr - 140, width=130, height=130
+        )
+
+    y -= 160
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(40, y, "Thank you for choosing Manthan Resorts!")
+    y -= 15
+    p.setFont("Helvetica", 10)
+    p.drawString(40, y, "This receipt serves as proof of advance booking payment.")
+    y -= 12
+    p.drawString(40, y, "Show the QR code at the resort for smooth check-in.")
+
+    p.showPage()
+    p.save()
+
+
+def get_receipt(booking):
+    """Return the storage path of the booking's current receipt, rendering it if needed."""
+    path = receipt_path(booking)
+    if not default_storage.exists(path):
+        buffer = BytesIO()
+        draw_receipt(booking, buffer)
+        saved = default_storage.save(path, ContentFile(buffer.getvalue()))
+        if saved != path:
+            # Rendered concurrently by another request; keep one copy
+            default_storage.delete(saved)
+    return path
+
+
+def invalidate_receipts(booking, keep_current=True):
+    """Delete cached receipts for ``booking`` other than its current version."""
+    keep = os.path.basename(receipt_path(booking)) if keep_current else None
+    try:
+        _, files = default_storage.listdir(_receipt_dir(booking.id))
+    except FileNotFoundError:
+        return
+    for name in files:
+        if name != keep:
+            default_storage.delete(f"{_receipt_dir(booking.id)}/{name}")
+
+
+def receipt_bytes(booking):
+    with default_storage.open(get_receipt(booking)) as f:
+        return f.read()
+
+
+def render_receipts(booking_ids):
+    """Make sure receipts exist for ``booking_ids``; returns how many were processed."""
+    from .models import Booking
+
+    bookings = Booking.objects.filter(id__in=booking_ids).select_related("resort")
+    for booking in bookings:
+        get_receipt(booking)
+    return len(bookings)
+
+
+class _ZipStream:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_receipts_zip(bookings):
+    """Yield a ZIP archive of the receipts for ``bookings`` one file at a time."""
+    stream = _ZipStream()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for booking in bookings:
+            archive.writestr(f"Receipt_{booking.id}.pdf", receipt_bytes(booking))
+            yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1,85 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_FIELDS = ("name", "location", "description", "amenities", "highlights")
+
+# bm25 weights follow SEARCH_FIELDS: name matters most, description least
+SQLITE_MATCH = "SELECT rowid FROM app_resort_fts WHERE app_resort_fts MATCH %s"
+SQLITE_RANK = (
+    "SELECT bm25(app_resort_fts, 10.0, 5.0, 1.0, 2.0, 2.0) FROM app_resort_fts "
+    "WHERE app_resort_fts MATCH %s AND rowid = app_resort.id"
+)
+POSTGRES_MATCH = "app_resort.search_vector @@ to_tsquery('simple', %s)"
+POSTGRES_RANK = "-ts_rank(app_resort.search_vector, to_tsquery('simple', %s))"
+
+
+def _tokens(query):
+    return re.findall(r"\w+", query.lower())[:10]
+
+
+def search_resorts(resorts, query):
+    """
+    Filter ``resorts`` to those matching every word of ``query`` (as a
+    prefix), annotated with ``search_rank`` where lower is better.
+
+    The match and the rank are part of the same SQL statement as the other
+    filters on ``resorts``, so ordering and pagination see every hit.
+    Backends without a full-text index fall back to icontains with an
+    equal rank for every hit.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return resorts.none().annotate(search_rank=Value(0, output_field=FloatField()))
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return resorts.filter(id__in=RawSQL(SQLITE_MATCH, [match])).annotate(
+            search_rank=RawSQL(SQLITE_RANK, [match], output_field=FloatField())
+        )
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{token}:*" for token in tokens)
+        return resorts.filter(RawSQL(POSTGRES_MATCH, [tsquery], output_field=BooleanField())).annotate(
+            search_rank=RawSQL(POSTGRES_RANK, [tsquery], output_field=FloatField())
+        )
+
+    words = Q()
+    for token in tokens:
+        any_field = Q()
+        for field in SEARCH_FIELDS:
+            any_field |= Q(**{f"{field}__icontains": token})
+        words &= any_field
+    return resorts.filter(words).annotate(search_rank=Value(0, output_field=FloatField()))
+
+
+def index_resort(resort):
+    if connection.vendor != "sqlite":
+        return  # Postgres maintains its generated search_vector column itself
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM app_resort_fts WHERE rowid = %s", [resort.pk])
+        cursor.execute(
+            "INSERT INTO app_resort_fts (rowid, name, location, description, amenities, highlights) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            [resort.pk] + [getattr(resort, field) or "" for field in SEARCH_FIELDS],
+        )
+
+
+def unindex_resort(resort_id):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM app_resort_fts WHERE rowid = %s", [resort_id])
+
+
+def rebuild_index():
+    """Re-index every resort, e.g. after bulk_create or raw SQL imports."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM app_resort_fts")
+        cursor.execute(
+            "INSERT INTO app_resort_fts (rowid, name, location, description, amenities, highlights) "
+            "SELECT id, name, location, description, amenities, highlights FROM app_resort"
+        )
@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import metrics, search, stats
+from .caching import bump_page_version
+from .jobs import enqueue
+from .models import Blog, Booking, GalleryImage, Offer, Resort, Wishlist
+from .receipts import RECEIPT_FIELDS, invalidate_receipts
+from .wishlist import adjust_wishlist_count
+
+
+# Booking fields whose every new value is counted in Prometheus
+STATUS_COUNTERS = {
+    "booking_status": metrics.BOOKINGS,
+    "payment_status": metrics.PAYMENTS,
+}
+
+
+@receiver(post_init, sender=Booking)
+def booking_loaded(sender, instance, **kwargs):
+    # Remember the stats bucket so a resort change also refreshes the old one
+    instance._stats_resort_id = instance.resort_id
+    # Read __dict__ so deferred fields are not fetched just to be remembered
+    instance._loaded_statuses = {
+        field: instance.__dict__.get(field) for field in STATUS_COUNTERS
+    }
+
+
+def _count_status_changes(instance, created, update_fields):
+    entered = []
+    for field, counter in STATUS_COUNTERS.items():
+        old = None if created else instance._loaded_statuses[field]
+        new = instance.__dict__.get(field)
+        if update_fields is not None and field not in update_fields:
+            continue
+        # An unknown old value (deferred field) is not counted as a change
+        if new is not None and new != old and (created or old is not None):
+            entered.append(counter.labels(new))
+            instance._loaded_statuses[field] = new
+
+    def increment():
+        for child in entered:
+            child.inc()
+
+    if entered:
+        transaction.on_commit(increment)
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, update_fields=None, **kwargs):
+    _count_status_changes(instance, created, update_fields)
+
+    if created or update_fields is None or stats.STATS_FIELDS.intersection(update_fields):
+        day = stats.booking_day(instance)
+        stats.refresh_day(instance.resort_id, day)
+        if instance._stats_resort_id not in (None, instance.resort_id):
+            stats.refresh_day(instance._stats_resort_id, day)
+        instance._stats_resort_id = instance.resort_id
+
+    if created:
+        return
+    if update_fields is None or RECEIPT_FIELDS.intersection(update_fields):
+        invalidate_receipts(instance)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    stats.refresh_day(instance.resort_id, stats.booking_day(instance))
+    invalidate_receipts(instance, keep_current=False)
+
+
+@receiver(post_save, sender=Resort)
+def resort_saved(sender, instance, **kwargs):
+    search.index_resort(instance)
+    bump_page_version("resorts")
+
+
+@receiver(post_delete, sender=Resort)
+def resort_deleted(sender, instance, **kwargs):
+    search.unindex_resort(instance.pk)
+    bump_page_version("resorts")
+
+
+@receiver([post_save, post_delete], sender=Blog)
+def blog_changed(sender, instance, **kwargs):
+    bump_page_version("blog")
+
+
+@receiver([post_save, post_delete], sender=GalleryImage)
+def gallery_image_changed(sender, instance, **kwargs):
+    bump_page_version("gallery")
+
+
+@receiver(post_save, sender=Wishlist)
+def wishlist_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_wishlist_count(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Wishlist)
+def wishlist_deleted(sender, instance, **kwargs):
+    adjust_wishlist_count(instance.user_id, -1)
+
+
+@receiver(post_init, sender=Resort)
+@receiver(post_init, sender=GalleryImage)
+@receiver(post_init, sender=Blog)
+@receiver(post_init, sender=Offer)
+def image_loaded(sender, instance, **kwargs):
+    instance._image_name = instance.image.name
+
+
+@receiver(post_save, sender=Resort)
+@receiver(post_save, sender=GalleryImage)
+@receiver(post_save, sender=Blog)
+@receiver(post_save, sender=Offer)
+def image_saved(sender, instance, created, **kwargs):
+    # Only new uploads need resized variants. post_init already saw the
+    # image of a row built with one, e.g. objects.create(image=...)
+    if instance.image and (created or instance.image.name != instance._image_name):
+        enqueue("generate_image_variants", name=instance.image.name)
+    instance._image_name = instance.image.name
@@ -0,0 +1,89 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Booking, BookingDailyStats
+
+PAID = Q(payment_status="Paid")
+
+# Booking fields that feed the rollups; payments reach them via payment_status
+STATS_FIELDS = {"resort", "payment_status", "total_price"}
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def booking_day(booking):
+    return timezone.localdate(booking.created_at)
+
+
+def _totals(bookings):
+    return bookings.aggregate(
+        bookings=Count("id"),
+        paid_bookings=Count("id", filter=PAID),
+        revenue=Sum("total_price", filter=PAID),
+    )
+
+
+def refresh_day(resort_id, day):
+    """
+    Recompute one (resort, day) rollup from its bookings.
+
+    Only that day's bookings for that resort are read (via
+    booking_resort_created_idx), so the cost does not grow with the table.
+    """
+    start, end = _day_bounds(day)
+    totals = _totals(Booking.objects.filter(resort_id=resort_id, created_at__gte=start, created_at__lt=end))
+    if not totals["bookings"]:
+        BookingDailyStats.objects.filter(resort_id=resort_id, day=day).delete()
+        return
+    BookingDailyStats.objects.update_or_create(
+        resort_id=resort_id,
+        day=day,
+        defaults={
+            "bookings": totals["bookings"],
+            "paid_bookings": totals["paid_bookings"],
+            "revenue": totals["revenue"] or 0,
+        },
+    )
+
+
+def rebuild_stats(since=None):
+    """Recreate every rollup (or those from ``since`` on) in one grouped query."""
+    bookings = Booking.objects.all()
+    if since:
+        bookings = bookings.filter(created_at__gte=_day_bounds(since)[0])
+
+    rows = (
+        bookings.annotate(day=TruncDate("created_at"))
+        .values("resort_id", "day")
+        .annotate(
+            bookings=Count("id"),
+            paid_bookings=Count("id", filter=PAID),
+            revenue=Sum("total_price", filter=PAID),
+        )
+        .order_by()
+    )
+    stats = [
+        BookingDailyStats(
+            resort_id=row["resort_id"],
+            day=row["day"],
+            bookings=row["bookings"],
+            paid_bookings=row["paid_bookings"],
+            revenue=row["revenue"] or 0,
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        existing = BookingDailyStats.objects.all()
+        if since:
+            existing = existing.filter(day__gte=since)
+        existing.delete()
+        BookingDailyStats.objects.bulk_create(stats, batch_size=500)
+    return len(stats)
@@ -0,0 +1,47 @@
+from django.utils.dateparse import parse_date
+
+from . import dashboard, emails, images, qr, receipts
+from .jobs import task
+from .models import Booking, PasswordResetOTP
+
+
+@task
+def send_receipt_email(booking_id):
+    emails.send_receipt_email(Booking.objects.select_related("resort").get(id=booking_id))
+
+
+@task
+def send_refund_email(booking_id):
+    emails.send_refund_email(Booking.objects.get(id=booking_id))
+
+
+@task
+def send_password_reset_otp(otp_id):
+    otp = PasswordResetOTP.objects.select_related("user").get(id=otp_id)
+    if not otp.is_used:
+        emails.send_password_reset_otp(otp)
+
+
+@task
+def render_receipt(booking_id):
+    receipts.get_receipt(Booking.objects.select_related("resort").get(id=booking_id))
+
+
+@task
+def generate_booking_qr(booking_id, url):
+    # Point the booking at the shared, content-addressed PNG
+    Booking.objects.filter(id=booking_id).update(qr_code=qr.get_qr(url, "png"))
+
+
+@task
+def generate_image_variants(name):
+    images.generate_variants(name)
+
+
+@task
+def refresh_dashboard_widget(widget, date_from=None, date_to=None):
+    dashboard.finish_refresh(
+        widget,
+        parse_date(date_from) if date_from else None,
+        parse_date(date_to) if date_to else None,
+    )
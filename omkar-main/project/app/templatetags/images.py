@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from app.images import srcset, variant_path, variant_widths
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, sizes="100vw", alt="", css_class="", eager=False):
+    """
+    Render ``image`` (an ImageField value) as a lazy-loaded <picture> with
+    WebP and JPEG srcsets, or as a plain lazy <img> until variants exist.
+    """
+    if not image:
+        return ""
+    loading = "eager" if eager else "lazy"
+    widths = variant_widths(image.name)
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            image.url, alt, css_class, loading,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(image.name, "webp", widths), sizes,
+        default_storage.url(variant_path(image.name, widths[-1], "jpg")),
+        srcset(image.name, "jpg", widths), sizes, alt, css_class, loading,
+    )
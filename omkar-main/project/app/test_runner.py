@@ -0,0 +1,18 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner that keeps the per-request JSON log lines out of the test output."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Swapped rather than disabled, so assertLogs("app.requests") still sees them
+        logger = logging.getLogger("app.requests")
+        self._request_handlers = logger.handlers
+        logger.handlers = [logging.NullHandler()]
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger("app.requests").handlers = self._request_handlers
+        super().teardown_test_environment(**kwargs)
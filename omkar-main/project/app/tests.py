@@ -1,3 +1,1647 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from . import dashboard, geo, images, jobs, qr, receipts, tasks, urls, views, wishlist
+from .pagination import paginate_keyset
+from .payments import get_or_create_order
+from .search import search_resorts
+from .bookings import BookingUnavailable, IdempotencyKeyReused, reserve_booking
+from .checks import check_shared_cache
+from .models import (
+    Blog,
+    Booking,
+    BookingDailyStats,
+    GalleryImage,
+    Guest,
+    Job,
+    PasswordResetOTP,
+    Payment,
+    Resort,
+    Wishlist,
+)
+from .qr import qr_digest
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="app-tests-")
+
+
+@dataclass
+class Route:
+    """One request against a named URL and the most queries it may run."""
+
+    name: str
+    max_queries: int
+    args: Callable = lambda t: ()
+    method: str = "get"
+    data: Callable = lambda t: None
+    user: str = "anon"           # "anon", "customer" or "staff"
+    status: int = 200
+    session: dict = field(default_factory=dict)
+    json: bool = False
+
+
+ROUTES = [
+    # API
+    Route("resort_list", 2),
+    Route("resort_list", 3, data=lambda t: {"search": "beach"}),
+    Route("resort_availability", 1, data=lambda t: {"check_in": "2031-01-10", "check_out": "2031-01-12"}),
+    Route("resort_nearby", 1, data=lambda t: {"lat": "15.5", "lng": "73.8", "radius_km": "50"}),
+    # Nearest-K widens its search radius until it finds K resorts
+    Route("resort_nearby", 4, data=lambda t: {"lat": "15.5", "lng": "73.8"}),
+    Route("create_booking", 11, method="post", json=True, data=lambda t: {
+        "resort_id": t.resorts[1].id, "check_in": "2032-02-01", "check_out": "2032-02-03",
+        "guests": 2, "guest_name": "API Guest", "guest_email": "api@example.com", "phone": "9000000009",
+    }),
+    Route("confirm_payment", 11, method="post", json=True, data=lambda t: {
+        "booking_id": t.unpaid.id, "payment_id": "pay_confirm",
+    }),
+
+    # Web pages; the index page counts its results for the pager
+    Route("index", 2),
+    Route("index", 5, user="customer"),
+    Route("index", 3, data=lambda t: {"search": "beach", "min_price": "100"}),
+    # Fewer resorts than a page, so the search widens to its maximum radius
+    # and then ranks every resort
+    Route("index", 10, data=lambda t: {"lat": "15.5", "lng": "73.8"}),
+    Route("resort_detail", 4, args=lambda t: (t.resorts[0].id,), user="customer"),
+    Route("book_resort", 4, args=lambda t: (t.resorts[0].id,), user="customer"),
+    Route("book_resort", 16, args=lambda t: (t.resorts[2].id,), method="post", user="customer", status=302,
+          data=lambda t: {
+              "guest_name": "Form Guest", "guest_phone": "9000000010", "check_in": "2032-03-01",
+              "check_out": "2032-03-02", "guests": "2", "idempotency_key": "budget-test-key",
+          }),
+    Route("about_us", 0),
+    Route("blog", 0),
+    Route("blog_detail", 1, args=lambda t: (t.blogs[0].id,)),
+    Route("contact", 0),
+    Route("gallery", 1),
+    Route("gallery_api", 1),
+    Route("gallery_api", 1, data=lambda t: {"limit": "5", "cursor": t.gallery_cursor}),
+    Route("events", 0),
+
+    # Refund / receipt
+    Route("refund_payment", 9, args=lambda t: ("pay_refund",), method="post", status=302),
+    Route("booking_confirmation", 2, args=lambda t: (t.paid.id,)),
+    Route("download_receipt", 1, args=lambda t: (t.paid.id,)),
+    Route("booking_qr", 1, args=lambda t: (t.paid.id, t.qr_digest(t.paid), "svg")),
+
+    # Authentication
+    Route("register", 0),
+    Route("signin", 0),
+    Route("logout", 4, user="customer", status=302),
+    Route("request_password_reset", 0),
+    Route("request_password_reset", 7, method="post", status=302,
+          data=lambda t: {"identifier": "customer@example.com"}),
+    Route("verify_reset_otp", 2, session={"reset_user_id": "customer"}),
+    Route("verify_reset_otp", 7, method="post", status=302, session={"reset_user_id": "customer"},
+          data=lambda t: {"otp": "123456"}),
+    Route("reset_password", 2, session={"reset_user_id": "customer", "otp_verified": True}),
+
+    # Profile
+    Route("profile", 3, user="customer"),
+
+    # Wishlist
+    Route("wishlist", 4, user="customer"),
+    Route("add_to_wishlist", 5, args=lambda t: (t.resorts[5].id,), user="customer", status=302),
+    Route("remove_from_wishlist", 4, args=lambda t: (t.resorts[5].id,), user="customer", status=302),
+    Route("wishlist_toggle", 4, args=lambda t: (t.resorts[6].id,), user="customer"),
+    Route("ajax_add_wishlist", 8, args=lambda t: (t.resorts[6].id,), method="post", user="customer"),
+    Route("wishlist_sync", 9, method="post", json=True, user="customer",
+          data=lambda t: {"add": [r.id for r in t.resorts[7:]], "remove": [t.resorts[0].id]}),
+
+    # Booking history and refunds
+    Route("booking_history", 4, user="customer"),
+    Route("booking_history_page", 4, user="customer", data=lambda t: {"cursor": t.history_cursor}),
+    Route("cancel_booking", 10, args=lambda t: (t.unpaid_to_cancel.id,), user="customer", status=302),
+    Route("refund_booking", 12, args=lambda t: (t.paid_to_refund.id,), user="customer", status=302),
+    Route("booking_detail", 2, args=lambda t: (t.paid.id,)),
+    Route("payment_page", 2, args=lambda t: (t.paid.id,)),
+
+    Route("verify_checkin", 8, args=lambda t: (t.paid.id,)),
+    Route("dashboard_widget", 5, args=lambda t: ("summary",), user="staff"),
+    Route("dashboard_widget", 3, args=lambda t: ("monthly",), user="staff"),
+    Route("dashboard_widget", 3, args=lambda t: ("top-resorts",), user="staff"),
+    Route("metrics", 2),
+]
+
+# Named routes that cannot be requested as-is, and why
+SKIPPED = {
+    "testimonials": "template does not exist yet",
+    "faq": "template does not exist yet",
+    "team": "template does not exist yet",
+    "admin_dashboard": "shadowed by the admin site; /dashboard/ is tested instead",
+}
+
+# Admin changelists must not grow with the number of rows listed
+ADMIN_MAX_QUERIES = 8
+
+# "SCAN app_booking" is a full table scan; "SCAN ... USING INDEX" is not
+FULL_SCAN = re.compile(r"\bSCAN (app_\w+)\b(?! USING)")
+
+
+class SeededTestCase(TestCase):
+    """A small but realistic dataset: resorts, bookings, payments, guests, content."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(
+            email="customer@example.com", password="secret-pass", phone="9000000001", name="Customer"
+        )
+        cls.staff = User.objects.create_superuser(
+            email="staff@example.com", password="secret-pass", phone="9000000002", name="Staff"
+        )
+
+        cls.resorts = [
+            Resort.objects.create(
+                name=f"Resort {i}",
+                location="Goa" if i % 2 else "Lonavala",
+                description="Quiet beach resort" if i % 3 == 0 else "Hill station retreat",
+                amenities="Pool, WiFi",
+                price_per_guest=Decimal(1000 + i * 250),
+                latitude=15.0 + i * 0.1,
+                longitude=73.5 + i * 0.1,
+                image=f"resort_images/resort_{i}.jpg",
+            )
+            for i in range(10)
+        ]
+
+        bookings = []
+        start = date(2031, 1, 1)
+        for i in range(60):
+            resort = cls.resorts[i % len(cls.resorts)]
+            check_in = start + timedelta(days=i)
+            bookings.append(
+                Booking.objects.create(
+                    user=cls.customer,
+                    resort=resort,
+                    guest_name=f"Guest {i}",
+                    guest_email=cls.customer.email,
+                    guest_phone="9000000001",
+                    check_in=check_in,
+                    check_out=check_in + timedelta(days=2),
+                    guests=2,
+                    total_price=resort.price_per_guest * 4,
+                    advance_paid=Decimal(100),
+                    pending_amount=resort.price_per_guest * 4 - 100,
+                    payment_status="Paid" if i % 3 else "Pending",
+                    razorpay_order_id=f"order_{i}",
+                    razorpay_order_amount=10000,
+                    razorpay_order_created_at=timezone.now(),
+                )
+            )
+        for booking in bookings:
+            if booking.payment_status == "Paid":
+                Payment.objects.create(
+                    booking=booking,
+                    payment_id=f"pay_{booking.id}",
+                    payment_method="Online",
+                    amount_paid=booking.total_price,
+                )
+            Guest.objects.bulk_create(
+                Guest(booking=booking, full_name=f"{booking.guest_name} #{n}", age=30 + n) for n in range(2)
+            )
+
+        cls.paid = bookings[1]
+        cls.paid_to_refund = bookings[2]
+        cls.unpaid = bookings[3]
+        cls.unpaid_to_cancel = bookings[6]
+        Payment.objects.create(
+            booking=bookings[9], payment_id="pay_refund", payment_method="Online", amount_paid=Decimal(100)
+        )
+
+        Wishlist.objects.bulk_create(Wishlist(user=cls.customer, resort=resort) for resort in cls.resorts[:4])
+        cls.blogs = [
+            Blog.objects.create(title=f"Post {i}", excerpt="Excerpt", content="Body " * 50, image=f"blogs/{i}.jpg")
+            for i in range(5)
+        ]
+        for i in range(30):
+            GalleryImage.objects.create(title=f"Photo {i}", image=f"gallery/photo_{i}.jpg")
+        PasswordResetOTP.objects.create(user=cls.customer, otp="123456")
+
+        # Background jobs queued by the signals above are not under test
+        Job.objects.all().delete()
+
+    def setUp(self):
+        patcher = mock.patch("app.payments.get_razorpay_client")
+        client = patcher.start()
+        client.return_value.order.create.return_value = {"id": "order_test"}
+        self.addCleanup(patcher.stop)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class QueryBudgetTests(SeededTestCase):
+    """
+    Every route runs within a fixed number of queries on a cold cache.
+
+    A failure here usually means an N+1 query crept in: fix the view with
+    select_related/prefetch_related before raising the budget.
+    """
+
+    @property
+    def history_cursor(self):
+        return self.client.get(reverse("booking_history_page")).json()["next_cursor"]
+
+    @property
+    def gallery_cursor(self):
+        return self.client.get(reverse("gallery_api"), {"limit": 5}).json()["next_cursor"]
+
+    def qr_digest(self, booking):
+        return qr_digest(f"http://testserver{reverse('verify_checkin', args=[booking.id])}")
+
+    def _request(self, route):
+        self.client.logout()
+        if route.user != "anon":
+            self.client.force_login(self.customer if route.user == "customer" else self.staff)
+        if route.session:
+            session = self.client.session
+            for key, value in route.session.items():
+                session[key] = self.customer.id if value == "customer" else value
+            session.save()
+
+        url = reverse(route.name, args=route.args(self))
+        data = route.data(self)
+        kwargs = {}
+        if route.json:
+            data = json.dumps(data)
+            kwargs["content_type"] = "application/json"
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, route.method)(url, data, **kwargs)
+        return response, queries
+
+    def test_routes_within_query_budget(self):
+        for route in ROUTES:
+            with self.subTest(route=route.name, method=route.method, user=route.user):
+                response, queries = self._request(route)
+                self.assertEqual(response.status_code, route.status)
+                self.assertLessEqual(
+                    len(queries),
+                    route.max_queries,
+                    "\n".join(q["sql"] for q in queries.captured_queries),
+                )
+
+    def test_every_named_route_is_budgeted(self):
+        names = {p.name for p in urls.urlpatterns if isinstance(p, URLPattern) and p.name}
+        covered = {route.name for route in ROUTES} | set(SKIPPED)
+        self.assertEqual(names - covered, set())
+
+    def test_dashboard_page(self):
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_admin_changelists_within_query_budget(self):
+        self.client.force_login(self.staff)
+        for model in admin.site._registry:
+            opts = model._meta
+            with self.subTest(model=opts.label):
+                url = reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist")
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries),
+                    ADMIN_MAX_QUERIES,
+                    "\n".join(q["sql"] for q in queries.captured_queries),
+                )
+
+
+class QueryPlanTests(SeededTestCase):
+    """The hot queries are answered from an index, not a full table scan."""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "sqlite":
+            self.skipTest("query plans are checked on SQLite")
+
+    def assertNoFullScan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = "\n".join(row[-1] for row in cursor.fetchall())
+        self.assertIsNone(FULL_SCAN.search(plan), plan)
+
+    def test_hot_queries_use_indexes(self):
+        resort = self.resorts[0]
+        queries = {
+            "availability": Booking.objects.filter(resort=resort).overlapping(
+                date(2031, 1, 10), date(2031, 1, 12)
+            ),
+            "booking history": Booking.objects.filter(user=self.customer).order_by("-id"),
+            "booking history page": Booking.objects.filter(user=self.customer, id__lt=self.paid.id).order_by("-id"),
+            "gallery": GalleryImage.objects.order_by("-uploaded_at", "-id"),
+            "nearby": geo.within_radius(Resort.objects.all(), 15.5, 73.8, 50),
+            "job claim": Job.objects.filter(status="queued", run_at__lte=timezone.now()).order_by(
+                "-priority", "run_at", "id"
+            ),
+            "daily stats refresh": Booking.objects.filter(
+                resort=resort, created_at__gte=timezone.now() - timedelta(days=1)
+            ),
+            "dashboard stats": BookingDailyStats.objects.filter(day__gte=date(2031, 1, 1)),
+            "wishlist count": Wishlist.objects.filter(user=self.customer),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assertNoFullScan(queryset)
+
+
+class RequestMetricsTests(SeededTestCase):
+    def test_logs_queries_and_outbound_calls(self):
+        Booking.objects.filter(pk=self.unpaid.pk).update(razorpay_order_id=None)
+        with self.assertLogs("app.requests", "INFO") as logs:
+            self.client.get(reverse("payment_page", args=[self.unpaid.id]))
+
+        record = logs.records[-1]
+        self.assertEqual(record.view, "payment_page")
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.db_queries, 0)
+        self.assertGreaterEqual(record.db_time_ms, record.slowest_query_ms)
+        self.assertIn("app_booking", record.slowest_query)
+        self.assertIn("razorpay", record.outbound_ms)
+
+
+class MetricsTests(SeededTestCase):
+    def test_exports_request_booking_and_queue_series(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("confirm_payment"),
+                json.dumps({"booking_id": self.unpaid.id, "payment_id": "pay_metrics"}),
+                content_type="application/json",
+            )
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('app_request_duration_seconds_count{method="POST",view="confirm_payment"}', body)
+        self.assertIn('app_payments_total{status="Paid"}', body)
+        self.assertIn('app_job_queue_depth{status="queued"} 2.0', body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfilingTests(SeededTestCase):
+    def test_sampled_request_is_profiled_and_reported(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=directory):
+            Client().get(reverse("index"))
+
+        profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertRegex(profiles[0], r"-index-\d+ms\.prof$")
+
+        out = io.StringIO()
+        call_command("profile_report", dir=directory, view="index", stdout=out)
+        self.assertIn("cProfile, 1 sampled requests", out.getvalue())
+
+
+class SeedDataTests(TestCase):
+    def test_seeds_related_rows_indexes_and_rollups(self):
+        call_command("seed_data", resorts=3, users=5, bookings=40, stdout=io.StringIO())
+
+        self.assertEqual(Resort.objects.count(), 3)
+        self.assertEqual(User.objects.filter(email__startswith="seed-").count(), 5)
+        self.assertEqual(Booking.objects.count(), 40)
+        self.assertEqual(
+            Payment.objects.count(),
+            Booking.objects.filter(payment_status__in=["Paid", "Refunded"]).count(),
+        )
+        self.assertEqual(Guest.objects.count(), sum(Booking.objects.values_list("guests", flat=True)))
+        self.assertEqual(
+            sum(BookingDailyStats.objects.values_list("bookings", flat=True)), Booking.objects.count()
+        )
+        self.assertTrue(self.client.login(email="seed-0@example.com", password="seed-password"))
+
+
+class SQLiteTuningTests(TestCase):
+    def test_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            # WAL is opt-in, so the committed database keeps its header
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal" if settings.SQLITE_WAL else "delete")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1 if settings.SQLITE_WAL else 2)  # NORMAL, FULL
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -20000)
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+
+def make_booking(resort, check_in, check_out, guests, **fields):
+    return Booking.objects.create(
+        resort=resort,
+        guest_name="Guest",
+        guest_email="guest@example.com",
+        guest_phone="9000000000",
+        check_in=check_in,
+        check_out=check_out,
+        guests=guests,
+        total_price=resort.price_per_guest * guests,
+        **fields,
+    )
+
+
+def stay_fields(check_in, check_out, guests):
+    return {
+        "guest_name": "Guest",
+        "guest_email": "guest@example.com",
+        "guest_phone": "9000000000",
+        "check_in": check_in,
+        "check_out": check_out,
+        "guests": guests,
+        "total_price": Decimal(1000) * guests,
+    }
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.resort = Resort.objects.create(
+            name="Small Resort", location="Goa", description="", price_per_guest=Decimal(1000), capacity=10
+        )
+        self.jan = lambda day: date(2031, 1, day)
+
+    def test_chained_bookings_count_the_busiest_night_not_their_sum(self):
+        make_booking(self.resort, self.jan(1), self.jan(3), 8)
+        make_booking(self.resort, self.jan(3), self.jan(5), 8)
+
+        self.assertEqual(self.resort.booked_guests(self.jan(1), self.jan(5)), 8)
+        self.assertTrue(self.resort.is_available(self.jan(1), self.jan(5), 2))
+        self.assertFalse(self.resort.is_available(self.jan(1), self.jan(5), 3))
+        self.assertEqual(
+            Resort.objects.with_booked_guests(self.jan(1), self.jan(5)).get(pk=self.resort.pk).booked_guests, 8
+        )
+
+        response = self.client.get(
+            reverse("resort_availability"), {"check_in": "2031-01-01", "check_out": "2031-01-05", "guests": 2}
+        )
+        self.assertEqual(response.json()[0]["available_capacity"], 2)
+
+    def test_overlapping_bookings_add_up_on_shared_nights(self):
+        make_booking(self.resort, self.jan(1), self.jan(4), 4)
+        make_booking(self.resort, self.jan(3), self.jan(6), 4)
+        make_booking(self.resort, self.jan(2), self.jan(3), 9, booking_status="Cancelled")
+
+        self.assertEqual(self.resort.booked_guests(self.jan(1), self.jan(6)), 8)
+        self.assertEqual(self.resort.booked_guests(self.jan(4), self.jan(6)), 4)
+        self.assertEqual(self.resort.booked_guests(self.jan(6), self.jan(8)), 0)
+        self.assertFalse(Resort.objects.available(self.jan(2), self.jan(5), 3).exists())
+        self.assertTrue(Resort.objects.available(self.jan(4), self.jan(5), 6).exists())
+
+    def test_reserve_booking_refuses_to_overbook(self):
+        make_booking(self.resort, self.jan(1), self.jan(3), 8)
+
+        booking, created = reserve_booking(self.resort, **stay_fields(self.jan(2), self.jan(4), 2))
+        self.assertTrue(created)
+        with self.assertRaises(BookingUnavailable):
+            reserve_booking(self.resort, **stay_fields(self.jan(2), self.jan(3), 1))
+        self.assertEqual(Booking.objects.filter(resort=self.resort).count(), 2)
+
+
+    def test_api_rejects_impossible_dates(self):
+        url = reverse("resort_availability")
+        for check_in, check_out in [("2024-02-30", "2024-03-02"), ("2024-03-01", "2024-13-01"), ("", "2024-03-02")]:
+            with self.subTest(check_in=check_in, check_out=check_out):
+                response = self.client.get(url, {"check_in": check_in, "check_out": check_out})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+
+class ReserveBookingRaceTests(TransactionTestCase):
+    def test_concurrent_requests_cannot_both_take_the_last_places(self):
+        resort = Resort.objects.create(
+            name="Small Resort", location="Goa", description="", price_per_guest=Decimal(1000), capacity=4
+        )
+        barrier = threading.Barrier(2)
+        outcomes = []
+
+        def reserve():
+            try:
+                barrier.wait()
+                reserve_booking(resort, **stay_fields(date(2031, 1, 1), date(2031, 1, 3), 3))
+                outcomes.append("booked")
+            except BookingUnavailable:
+                outcomes.append("unavailable")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=reserve) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ["booked", "unavailable"])
+        self.assertEqual(Booking.objects.filter(resort=resort).count(), 1)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.resort = Resort.objects.create(
+            name="Resort", location="Goa", description="", price_per_guest=Decimal(1000), capacity=20
+        )
+        self.user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        patcher = mock.patch("app.payments.get_razorpay_client")
+        self.razorpay = patcher.start().return_value
+        self.razorpay.order.create.return_value = {"id": "order_test"}
+        self.addCleanup(patcher.stop)
+
+    def book(self, key):
+        return self.client.post(reverse("book_resort", args=[self.resort.id]), {
+            "guest_name": "Guest",
+            "guest_phone": "9000000001",
+            "check_in": "2031-01-01",
+            "check_out": "2031-01-03",
+            "guests": "2",
+            "idempotency_key": key,
+        })
+
+    def test_replayed_form_submission_returns_the_original_booking(self):
+        self.client.force_login(self.user)
+        first, second = self.book("key-1"), self.book("key-1")
+
+        booking = Booking.objects.get()
+        self.assertRedirects(first, reverse("payment_page", args=[booking.id]), fetch_redirect_response=False)
+        self.assertEqual(second["Location"], first["Location"])
+        self.assertEqual(self.razorpay.order.create.call_count, 1)
+        self.assertEqual(Job.objects.filter(task="generate_booking_qr").count(), 1)
+
+        self.book("key-2")
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_replayed_api_request_returns_the_original_booking(self):
+        body = json.dumps({
+            "resort_id": self.resort.id,
+            "guest_name": "Guest",
+            "guest_email": "guest@example.com",
+            "phone": "9000000001",
+            "check_in": "2031-01-01",
+            "check_out": "2031-01-03",
+            "guests": 2,
+        })
+        responses = [
+            self.client.post(
+                reverse("create_booking"), body, content_type="application/json", headers={"Idempotency-Key": "api-1"}
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_key_cannot_be_replayed_by_another_user(self):
+        fields = stay_fields(date(2031, 1, 1), date(2031, 1, 3), 2)
+        reserve_booking(self.resort, idempotency_key="shared", user=self.user, **fields)
+        other = User.objects.create_user(email="other@example.com", password="secret-pass", phone="9000000002")
+
+        with self.assertRaises(IdempotencyKeyReused):
+            reserve_booking(self.resort, idempotency_key="shared", user=other, **fields)
+
+    def test_key_cannot_be_replayed_for_a_different_stay(self):
+        fields = stay_fields(date(2031, 1, 1), date(2031, 1, 3), 2)
+        booking, _ = reserve_booking(self.resort, idempotency_key="once", user=self.user, **fields)
+        other_resort = Resort.objects.create(
+            name="Other", location="Goa", description="", price_per_guest=Decimal(1000), capacity=20
+        )
+
+        for resort, changes in [
+            (self.resort, {"check_in": date(2031, 1, 2)}),
+            (self.resort, {"check_out": date(2031, 1, 4)}),
+            (self.resort, {"guests": 3}),
+            (other_resort, {}),
+        ]:
+            with self.subTest(resort=resort.name, **changes), self.assertRaises(IdempotencyKeyReused):
+                reserve_booking(resort, idempotency_key="once", user=self.user, **{**fields, **changes})
+        self.assertEqual(Booking.objects.get(), booking)
+
+    def test_api_answers_a_changed_replay_with_422(self):
+        body = {
+            "resort_id": self.resort.id, "guest_name": "Guest", "guest_email": "guest@example.com",
+            "phone": "9000000001", "check_in": "2031-01-01", "check_out": "2031-01-03", "guests": 2,
+        }
+        statuses = [
+            self.client.post(
+                reverse("create_booking"), json.dumps({**body, **changes}), content_type="application/json",
+                headers={"Idempotency-Key": "api-2"},
+            ).status_code
+            for changes in [{}, {"guests": 4}]
+        ]
+        self.assertEqual(statuses, [200, 422])
+
+
+@override_settings(RAZORPAY_ORDER_TTL=3600)
+class RazorpayOrderTests(TestCase):
+    def setUp(self):
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        self.booking = make_booking(resort, date(2031, 1, 1), date(2031, 1, 3), 2)
+        patcher = mock.patch("app.payments.get_razorpay_client")
+        self.create = patcher.start().return_value.order.create
+        self.create.side_effect = lambda data: {"id": f"order_{self.create.call_count}"}
+        self.addCleanup(patcher.stop)
+
+    def test_order_is_reused_for_the_same_amount(self):
+        first = get_or_create_order(self.booking, 10000)
+        reloaded = Booking.objects.get(pk=self.booking.pk)
+
+        self.assertEqual(get_or_create_order(reloaded, 10000), first)
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(reloaded.razorpay_order_amount, 10000)
+
+    def test_new_order_for_a_different_amount(self):
+        first = get_or_create_order(self.booking, 10000)
+
+        self.assertNotEqual(get_or_create_order(self.booking, 20000), first)
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_new_order_once_the_ttl_has_passed(self):
+        first = get_or_create_order(self.booking, 10000)
+        later = timezone.now() + timedelta(seconds=3601)
+
+        with mock.patch("app.payments.timezone.now", return_value=later):
+            self.assertNotEqual(get_or_create_order(self.booking, 10000), first)
+        self.assertEqual(self.create.call_count, 2)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(jobs.TASKS, {"flaky": self.flaky})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def flaky(self, fail_times):
+        self.calls.append(fail_times)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError("boom")
+
+    def test_claims_the_most_urgent_due_job(self):
+        later = jobs.enqueue("flaky", run_at=timezone.now() + timedelta(minutes=5), fail_times=0)
+        normal = jobs.enqueue("flaky", fail_times=0)
+        urgent = jobs.enqueue("flaky", priority=jobs.PRIORITY_HIGH, fail_times=0)
+
+        self.assertEqual(jobs.claim_next().pk, urgent.pk)
+        self.assertEqual(jobs.claim_next().pk, normal.pk)
+        self.assertIsNone(jobs.claim_next())
+        self.assertEqual(Job.objects.get(pk=later.pk).status, "queued")
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue("flaky", fail_times=1)
+
+        before = timezone.now()
+        self.assertFalse(jobs.run_job(jobs.claim_next()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=jobs.BACKOFF_BASE * 0.8))
+        self.assertIsNone(jobs.claim_next())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertTrue(jobs.run_job(jobs.claim_next()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("done", 2))
+
+    def test_job_fails_permanently_after_max_attempts(self):
+        job = jobs.enqueue("flaky", max_attempts=2, fail_times=5)
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.assertFalse(jobs.run_job(jobs.claim_next()))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_backoff_grows_exponentially_up_to_the_cap(self):
+        with mock.patch("app.jobs.random.uniform", return_value=1):
+            self.assertEqual(jobs.backoff(1), timedelta(seconds=jobs.BACKOFF_BASE))
+            self.assertEqual(jobs.backoff(3), timedelta(seconds=jobs.BACKOFF_BASE * 4))
+            self.assertEqual(jobs.backoff(30), timedelta(seconds=jobs.BACKOFF_MAX))
+
+    def test_requeue_stale_only_touches_jobs_past_the_lock_timeout(self):
+        stale = jobs.enqueue("flaky", fail_times=0)
+        fresh = jobs.enqueue("flaky", fail_times=0)
+        Job.objects.filter(pk=stale.pk).update(
+            status="running", locked_at=timezone.now() - timedelta(seconds=jobs.LOCK_TIMEOUT + 1)
+        )
+        Job.objects.filter(pk=fresh.pk).update(status="running", locked_at=timezone.now())
+        # Its worker died on every one of its attempts
+        exhausted = jobs.enqueue("flaky", fail_times=0, max_attempts=2)
+        Job.objects.filter(pk=exhausted.pk).update(
+            status="running", attempts=2, locked_at=timezone.now() - timedelta(seconds=jobs.LOCK_TIMEOUT + 1)
+        )
+
+        with self.assertLogs("app.jobs", "ERROR"):
+            self.assertEqual(jobs.requeue_stale(), 2)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, "queued")
+        self.assertEqual(Job.objects.get(pk=fresh.pk).status, "running")
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.locked_at), ("failed", None))
+        self.assertIn("Worker lost", exhausted.last_error)
+
+    def test_burst_worker_drains_the_queue(self):
+        jobs.enqueue("flaky", fail_times=0)
+        jobs.enqueue("flaky", fail_times=0)
+
+        # Keep the test transaction's connection open
+        with mock.patch("app.jobs.close_old_connections"), mock.patch("app.jobs.connections"):
+            self.assertEqual(jobs.work(burst=True), 2)
+        self.assertFalse(Job.objects.exclude(status="done").exists())
+
+
+def use_temp_media(test):
+    """Point MEDIA_ROOT at a directory removed when ``test`` ends."""
+    directory = tempfile.mkdtemp(prefix="app-tests-")
+    test.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+    override = override_settings(MEDIA_ROOT=directory)
+    override.enable()
+    test.addCleanup(override.disable)
+    return directory
+
+
+class BookingQRTests(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        self.booking = make_booking(resort, date(2031, 1, 1), date(2031, 1, 3), 2)
+        self.payload = f"http://testserver{reverse('verify_checkin', args=[self.booking.id])}"
+        self.digest = qr_digest(self.payload)
+
+    def test_each_payload_is_rendered_once(self):
+        with mock.patch("app.qr.render_qr", wraps=qr.render_qr) as render:
+            path = qr.get_qr(self.payload, "svg")
+            self.assertEqual(qr.get_qr(self.payload, "svg"), path)
+        self.assertEqual(render.call_count, 1)
+        self.assertIn(self.digest, path)
+
+    def test_serves_the_image_with_its_digest_as_etag(self):
+        url = reverse("booking_qr", args=[self.booking.id, self.digest, "png"])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"\x89PNG"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_stale_digest_redirects_to_the_current_image(self):
+        response = self.client.get(reverse("booking_qr", args=[self.booking.id, "0" * 32, "svg"]))
+
+        self.assertRedirects(
+            response, reverse("booking_qr", args=[self.booking.id, self.digest, "svg"]), fetch_redirect_response=False
+        )
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+    def test_job_points_the_booking_at_the_cached_png(self):
+        tasks.generate_booking_qr(self.booking.id, self.payload)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.qr_code.name, qr.qr_path(self.digest, "png"))
+
+
+class ReceiptCacheTests(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        self.booking = make_booking(resort, date(2031, 1, 1), date(2031, 1, 3), 2)
+        self.url = reverse("download_receipt", args=[self.booking.id])
+
+    def test_receipt_is_rendered_once_and_revalidated_with_its_etag(self):
+        with mock.patch("app.receipts.draw_receipt", wraps=receipts.draw_receipt) as draw:
+            first = self.client.get(self.url)
+            self.assertEqual(first.status_code, 200)
+            self.assertTrue(b"".join(first.streaming_content).startswith(b"%PDF"))
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(draw.call_count, 1)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(first["ETag"], f'"{receipts.receipt_fingerprint(self.booking)}"')
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        cached = self.client.get(self.url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+
+    def test_email_attaches_the_cached_receipt(self):
+        self.booking.refresh_from_db()
+        pdf = receipts.receipt_bytes(self.booking)
+        with mock.patch("app.receipts.draw_receipt") as draw:
+            tasks.send_receipt_email(self.booking.id)
+        draw.assert_not_called()
+
+        (message,) = mail.outbox
+        self.assertEqual(message.to, [self.booking.guest_email])
+        self.assertEqual(message.attachments, [(f"Receipt_{self.booking.id}.pdf", pdf, "application/pdf")])
+
+
+class RenderReceiptsCommandTests(TransactionTestCase):
+    """Real worker processes, so the bookings must be committed where they can see them."""
+
+    def setUp(self):
+        use_temp_media(self)
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        for guests in (1, 2, 3):
+            make_booking(resort, date(2031, 1, 1), date(2031, 1, 3), guests)
+
+    def test_warms_the_receipt_cache_in_parallel(self):
+        today = timezone.localdate().isoformat()
+        out = io.StringIO()
+        call_command("render_receipts", "--from", today, "--to", today, "--processes", "2", "--chunk-size", "2",
+                     stdout=out)
+
+        self.assertIn("Done: 3 receipts.", out.getvalue())
+        bookings = Booking.objects.order_by("id")
+        for booking in bookings:
+            self.assertTrue(default_storage.exists(receipts.receipt_path(booking)))
+        with mock.patch("app.receipts.draw_receipt") as draw:
+            receipts.get_receipt(bookings[0])
+        draw.assert_not_called()
+
+    def test_rejects_impossible_dates(self):
+        with self.assertRaisesMessage(CommandError, "--from and --to must be valid dates"):
+            call_command("render_receipts", "--from", "2024-02-30", "--to", "2024-03-02")
+class ReceiptInvalidationTests(TestCase):
+    def setUp(self):
+        self.media = use_temp_media(self)
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        make_booking(resort, date(2031, 1, 1), date(2031, 1, 3), 2)
+        self.booking = Booking.objects.select_related("resort").get()
+
+    def cached_receipts(self):
+        return sorted(os.listdir(os.path.join(self.media, "receipts", str(self.booking.id))))
+
+    def test_editing_a_printed_field_replaces_the_cached_receipt(self):
+        old = receipts.get_receipt(self.booking)
+        self.booking.guest_name = "Renamed Guest"
+        self.booking.save()
+
+        new = receipts.get_receipt(self.booking)
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.cached_receipts(), [os.path.basename(new)])
+
+    def test_other_changes_keep_the_cached_receipt(self):
+        path = receipts.get_receipt(self.booking)
+        self.booking.checkin_verified = True
+        self.booking.save(update_fields=["checkin_verified"])
+
+        self.assertEqual(receipts.get_receipt(self.booking), path)
+        self.assertEqual(self.cached_receipts(), [os.path.basename(path)])
+
+    def test_deleting_the_booking_removes_its_receipts(self):
+        receipts.get_receipt(self.booking)
+        Booking.objects.filter(pk=self.booking.pk).delete()
+
+        self.assertEqual(self.cached_receipts(), [])
+
+    def test_admin_exports_receipts_as_zip_and_rejects_bad_dates(self):
+        staff = User.objects.create_superuser(email="staff@example.com", password="secret-pass", phone="9000000002")
+        self.client.force_login(staff)
+        url = reverse("admin:app_booking_export_receipts")
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(url, {"from": today, "to": today})
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f"Receipt_{self.booking.id}.pdf"])
+
+        self.assertEqual(self.client.get(url, {"from": "2024-02-30", "to": today}).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.resorts = [
+            Resort.objects.create(name=f"Resort {i}", location="Goa", description="", price_per_guest=Decimal(1000))
+            for i in range(5)
+        ]
+
+    def walk(self, limit, between_pages=None):
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(reverse("resort_list"), {"limit": limit, "cursor": cursor or ""})
+            page = response.json()
+            seen += [row["id"] for row in page["results"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+            if between_pages:
+                between_pages()
+                between_pages = None
+
+    def test_pages_cover_every_resort_once(self):
+        self.assertEqual(self.walk(2), [resort.id for resort in self.resorts])
+
+    def test_pages_stay_stable_while_resorts_are_added_and_removed(self):
+        ids = [resort.id for resort in self.resorts]
+
+        def churn():
+            self.resorts[0].delete()
+            Resort.objects.create(name="New", location="Goa", description="", price_per_guest=Decimal(1000))
+
+        seen = self.walk(2, churn)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen[:5], ids)
+
+    def test_ties_on_the_first_ordering_field_are_broken_by_id(self):
+        same_day = date(2031, 1, 1)
+        bookings = [make_booking(self.resorts[0], same_day, same_day + timedelta(days=1), 1) for _ in range(5)]
+
+        ordering = ("-check_in", "-id")
+        first, cursor = paginate_keyset(Booking.objects.all(), ordering, limit=3)
+        second, cursor = paginate_keyset(Booking.objects.all(), ordering, cursor, limit=3)
+
+        self.assertIsNone(cursor)
+        self.assertEqual([b.id for b in first + second], [b.id for b in reversed(bookings)])
+
+    def test_cursor_keeps_sub_millisecond_timestamps(self):
+        uploaded_at = timezone.now().replace(microsecond=500)
+        images = [GalleryImage.objects.create(title=f"Photo {i}", image=f"gallery/{i}.jpg") for i in range(2)]
+        for offset, image in enumerate(images):
+            GalleryImage.objects.filter(pk=image.pk).update(uploaded_at=uploaded_at + timedelta(microseconds=offset))
+
+        first, cursor = paginate_keyset(GalleryImage.objects.all(), ("-uploaded_at", "-id"), limit=1)
+        second, _ = paginate_keyset(GalleryImage.objects.all(), ("-uploaded_at", "-id"), cursor, limit=1)
+        self.assertEqual([image.id for image in first + second], [images[1].id, images[0].id])
+
+    def test_projection_validators_and_bad_cursors(self):
+        response = self.client.get(reverse("resort_list"), {"fields": "name,bogus", "limit": 1})
+        self.assertEqual(list(response.json()["results"][0]), ["name"])
+        self.assertEqual(
+            self.client.get(reverse("resort_list"), headers={"If-None-Match": response["ETag"]}).status_code, 200
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("resort_list"), {"fields": "name,bogus", "limit": 1}, headers={"If-None-Match": response["ETag"]}
+            ).status_code,
+            304,
+        )
+        self.assertEqual(self.client.get(reverse("resort_list"), {"cursor": "not-a-cursor"}).status_code, 400)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        for i in range(30):
+            Resort.objects.create(
+                name=f"Beach Resort {i}" if i % 3 == 0 else f"Hill Retreat {i}",
+                location="Goa",
+                description="Rooms by the beach" if i % 2 == 0 else "Pine forest cabins",
+                price_per_guest=Decimal(1000 + i),
+            )
+
+    def test_ranks_name_matches_first_and_combines_with_filters(self):
+        hits = search_resorts(Resort.objects.filter(price_per_guest__lt=1020), "beach").order_by("search_rank", "id")
+
+        names = [resort.name for resort in hits]
+        self.assertEqual(len(names), 13)  # 7 names, plus 6 more described as "by the beach"
+        self.assertTrue(all(name.startswith("Beach") for name in names[:7]))
+        self.assertFalse(search_resorts(Resort.objects.all(), "   ").exists())
+
+    def test_index_paginates_over_every_hit(self):
+        with mock.patch("app.views.RESORTS_PAGE_SIZE", 4):
+            first = self.client.get(reverse("index"), {"search": "beach"})
+            last = self.client.get(reverse("index"), {"search": "beach", "page": 5})
+
+        self.assertEqual(first.context["page_obj"].paginator.count, 20)
+        self.assertEqual(len(last.context["resorts"]), 4)
+        self.assertContains(first, "page=2")
+        self.assertContains(first, "search=beach")
+
+
+class NearbyTests(TestCase):
+    # Panaji, Goa; Mumbai is about 410 km north of it
+    PANAJI = (15.4909, 73.8278)
+    MUMBAI = (19.0760, 72.8777)
+
+    def resort(self, name, lat, lng):
+        return Resort.objects.create(
+            name=name, location="", description="", price_per_guest=Decimal(1000), latitude=lat, longitude=lng
+        )
+
+    def test_haversine_distance_matches_known_cities(self):
+        self.resort("Mumbai", *self.MUMBAI)
+
+        (found,) = geo.within_radius(Resort.objects.all(), *self.PANAJI, 1000)
+        self.assertAlmostEqual(found.distance_km, 410, delta=5)
+
+    def test_radius_search_is_sorted_and_bounded(self):
+        near = self.resort("Near", 15.50, 73.83)
+        middle = self.resort("Middle", 15.60, 73.90)
+        self.resort("Far", *self.MUMBAI)
+
+        hits = list(geo.within_radius(Resort.objects.all(), *self.PANAJI, 50))
+        self.assertEqual(hits, [near, middle])
+        self.assertLess(hits[0].distance_km, hits[1].distance_km)
+
+    def test_nearest_widens_the_radius_until_it_has_k_resorts(self):
+        self.resort("Near", 15.50, 73.83)
+        far = self.resort("Far", *self.MUMBAI)
+
+        with mock.patch("app.geo.within_radius", wraps=geo.within_radius) as search:
+            hits = list(geo.nearest(Resort.objects.all(), *self.PANAJI, 2))
+        self.assertEqual(hits[-1], far)
+        radii = [call.args[-1] for call in search.call_args_list]
+        self.assertEqual(radii, [geo.INITIAL_RADIUS_KM * 2 ** i for i in range(len(radii))])
+        self.assertGreaterEqual(radii[-1], 410)
+
+    def test_each_radius_is_one_query_and_its_rows_are_reused(self):
+        near = self.resort("Near", 15.50, 73.83)
+
+        with self.assertNumQueries(1):
+            hits = geo.nearest(Resort.objects.all(), *self.PANAJI, 1)
+            self.assertEqual(list(hits), [near])
+
+    def test_nearest_ranks_every_resort_past_the_maximum_radius(self):
+        near = self.resort("Near", 15.50, 73.83)
+        # About 8,000 km away, beyond any bounding box the search tries
+        london = self.resort("London", 51.5074, -0.1278)
+
+        tries = int(math.log2(geo.MAX_RADIUS_KM / geo.INITIAL_RADIUS_KM)) + 1
+        with self.assertNumQueries(tries + 1):
+            hits = list(geo.nearest(Resort.objects.all(), *self.PANAJI, 5))
+        self.assertEqual(hits, [near, london])
+        self.assertAlmostEqual(hits[1].distance_km, 7600, delta=300)
+
+    def test_api_validates_the_point(self):
+        self.resort("Near", 15.50, 73.83)
+
+        response = self.client.get(reverse("resort_nearby"), {"lat": "15.4909", "lng": "73.8278"})
+        self.assertEqual([row["name"] for row in response.json()], ["Near"])
+        self.assertEqual(self.client.get(reverse("resort_nearby"), {"lat": "95", "lng": "0"}).status_code, 400)
+
+
+class WishlistCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        self.resorts = [
+            Resort.objects.create(name=f"Resort {i}", location="Goa", description="", price_per_guest=Decimal(1000))
+            for i in range(3)
+        ]
+
+    def test_count_is_cached_and_adjusted_on_change(self):
+        Wishlist.objects.create(user=self.user, resort=self.resorts[0])
+        self.assertEqual(wishlist.wishlist_count(self.user), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(wishlist.wishlist_count(self.user), 1)
+
+        Wishlist.objects.create(user=self.user, resort=self.resorts[1])
+        Wishlist.objects.filter(resort=self.resorts[0]).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(wishlist.wishlist_count(self.user), 1)
+
+        wishlist.sync_wishlist(self.user, add=[resort.id for resort in self.resorts])
+        self.assertEqual(wishlist.wishlist_count(self.user), 3)
+
+    def test_process_local_cache_keeps_the_count_briefly(self):
+        with mock.patch("app.wishlist.cache.set", wraps=cache.set) as cache_set:
+            wishlist.wishlist_count(self.user)
+        self.assertEqual(cache_set.call_args.args[2], wishlist.LOCAL_COUNT_TIMEOUT)
+
+        cache.clear()
+        with (
+            mock.patch("app.wishlist.cache_is_shared", return_value=True),
+            mock.patch("app.wishlist.cache.set", wraps=cache.set) as cache_set,
+        ):
+            wishlist.wishlist_count(self.user)
+        self.assertEqual(cache_set.call_args.args[2], wishlist.COUNT_TIMEOUT)
+
+    def test_badge_reads_the_count(self):
+        Wishlist.objects.create(user=self.user, resort=self.resorts[0])
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse("profile")).context["wishlist_count"], 1)
+
+
+class WishlistToggleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        self.resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+
+    def test_adding_takes_one_statement_and_updates_the_count(self):
+        self.assertEqual(wishlist.wishlist_count(self.user), 0)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(wishlist.toggle_wishlist(self.user, self.resort.id))
+        self.assertTrue(Wishlist.objects.filter(user=self.user, resort=self.resort).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(wishlist.wishlist_count(self.user), 1)
+
+    def test_removing_deletes_after_an_empty_insert(self):
+        Wishlist.objects.create(user=self.user, resort=self.resort)
+        self.assertEqual(wishlist.wishlist_count(self.user), 1)
+
+        with self.assertNumQueries(2):
+            self.assertFalse(wishlist.toggle_wishlist(self.user, self.resort.id))
+        self.assertFalse(Wishlist.objects.exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(wishlist.wishlist_count(self.user), 0)
+
+    def test_unknown_resort_is_rejected(self):
+        with self.assertRaises(Resort.DoesNotExist):
+            wishlist.toggle_wishlist(self.user, self.resort.id + 1)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("wishlist_toggle", args=[self.resort.id + 1])).status_code, 404)
+
+    def test_view_reports_state_and_count(self):
+        self.client.force_login(self.user)
+        url = reverse("wishlist_toggle", args=[self.resort.id])
+
+        self.assertEqual(self.client.get(url).json()["count"], 1)
+        response = self.client.get(url).json()
+        self.assertEqual((response["in_wishlist"], response["count"]), (False, 0))
+
+
+class WishlistSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        self.resorts = [
+            Resort.objects.create(name=f"Resort {i}", location="Goa", description="", price_per_guest=Decimal(1000))
+            for i in range(4)
+        ]
+        self.ids = [resort.id for resort in self.resorts]
+        Wishlist.objects.create(user=self.user, resort=self.resorts[0])
+        self.client.force_login(self.user)
+
+    def sync(self, body):
+        return self.client.post(
+            reverse("wishlist_sync"), body if isinstance(body, str) else json.dumps(body),
+            content_type="application/json",
+        )
+
+    def test_applies_adds_and_removes_and_ignores_unknown_resorts(self):
+        unknown = max(self.ids) + 1
+        response = self.sync({"add": [self.ids[1], self.ids[2], unknown], "remove": [self.ids[0], self.ids[2]]})
+
+        # An id in both lists ends up removed
+        self.assertEqual(response.json(), {"resort_ids": [self.ids[1]], "count": 1})
+        self.assertEqual(list(Wishlist.objects.values_list("resort_id", flat=True)), [self.ids[1]])
+        self.assertEqual(wishlist.wishlist_count(self.user), 1)
+
+    def test_re_adding_is_idempotent(self):
+        for _ in range(2):
+            response = self.sync({"add": [self.ids[0], self.ids[3]]})
+        self.assertEqual(sorted(response.json()["resort_ids"]), [self.ids[0], self.ids[3]])
+        self.assertEqual(Wishlist.objects.count(), 2)
+
+    def test_rejects_malformed_bodies(self):
+        for body in ["{not json", "[1, 2]", json.dumps({"add": ["x"]}), json.dumps({"remove": 5})]:
+            with self.subTest(body=body):
+                self.assertEqual(self.sync(body).status_code, 400)
+        self.assertEqual(list(Wishlist.objects.values_list("resort_id", flat=True)), [self.ids[0]])
+
+        self.client.logout()
+        self.assertEqual(self.sync({"add": [self.ids[1]]}).status_code, 403)
+
+
+class BookingStatsTests(TestCase):
+    def setUp(self):
+        self.resorts = [
+            Resort.objects.create(name=name, location="Goa", description="", price_per_guest=Decimal(1000))
+            for name in ("Beach Resort", "Hill Resort")
+        ]
+
+    def live_totals(self):
+        """The rollups recomputed from every booking, outside app.stats."""
+        totals = {}
+        for booking in Booking.objects.all():
+            key = (booking.resort_id, timezone.localdate(booking.created_at))
+            count, paid, revenue = totals.get(key, (0, 0, Decimal(0)))
+            if booking.payment_status == "Paid":
+                paid, revenue = paid + 1, revenue + booking.total_price
+            totals[key] = (count + 1, paid, revenue)
+        return totals
+
+    def rollups(self):
+        return {
+            (row.resort_id, row.day): (row.bookings, row.paid_bookings, row.revenue)
+            for row in BookingDailyStats.objects.all()
+        }
+
+    def make_history(self):
+        beach, hill = self.resorts
+        for days_ago, resort, guests, status in [
+            (0, beach, 2, "Paid"), (0, beach, 3, "Pending"), (0, hill, 1, "Paid"),
+            (1, beach, 4, "Paid"), (1, hill, 2, "Failed"), (5, hill, 3, "Paid"),
+        ]:
+            booking = make_booking(resort, date(2031, 1, 1), date(2031, 1, 2), guests, payment_status=status)
+            # A queryset update skips the signals, leaving the rollups behind
+            Booking.objects.filter(pk=booking.pk).update(
+                created_at=booking.created_at - timedelta(days=days_ago)
+            )
+
+    def test_signals_keep_rollups_in_line_with_bookings(self):
+        beach, hill = self.resorts
+        first = make_booking(beach, date(2031, 1, 1), date(2031, 1, 2), 2)
+        second = make_booking(beach, date(2031, 1, 3), date(2031, 1, 4), 3)
+        make_booking(hill, date(2031, 1, 1), date(2031, 1, 2), 1, payment_status="Paid")
+
+        first.payment_status = "Paid"
+        first.save(update_fields=["payment_status"])
+        second.resort = hill
+        second.save()
+        self.assertEqual(self.rollups(), self.live_totals())
+
+        first.delete()
+        self.assertEqual(self.rollups(), self.live_totals())
+
+    def test_rebuild_matches_live_aggregates(self):
+        self.make_history()
+        self.assertNotEqual(self.rollups(), self.live_totals())
+
+        call_command("rebuild_stats", stdout=io.StringIO())
+        self.assertEqual(self.rollups(), self.live_totals())
+        self.assertEqual(len(self.rollups()), 5)
+
+    def test_rebuild_since_leaves_older_days_alone(self):
+        self.make_history()
+        call_command("rebuild_stats", stdout=io.StringIO())
+        before = self.rollups()
+        Booking.objects.update(total_price=Decimal(1))
+
+        since = timezone.localdate() - timedelta(days=1)
+        call_command("rebuild_stats", since=str(since), stdout=io.StringIO())
+        live = self.live_totals()
+        for key, value in self.rollups().items():
+            self.assertEqual(value, live[key] if key[1] >= since else before[key])
+        self.assertNotEqual(before, live)
+        self.assertEqual(self.rollups().keys(), live.keys())
+
+    def test_rebuild_rejects_bad_dates(self):
+        for since in ("yesterday", "2024-02-30"):
+            with self.subTest(since=since), self.assertRaisesMessage(CommandError, "--since must be a valid date."):
+                call_command("rebuild_stats", since=since)
+
+
+class InlineThread:
+    """Stands in for threading.Thread and runs the target on start()."""
+
+    def __init__(self, target, args=(), **kwargs):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+class DashboardRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        make_booking(resort, date(2031, 1, 1), date(2031, 1, 2), 2)
+        self.lock = f"{dashboard._key('summary', None, None)}:refreshing"
+
+    def serve_stale(self):
+        """Cache a summary computed before the latest booking and past FRESH_FOR."""
+        data, _ = dashboard.get_widget("summary")
+        entry = cache.get(dashboard._key("summary", None, None))
+        entry["data"] = {**data, "total_bookings": 0}
+        entry["computed_at"] -= dashboard.FRESH_FOR + 1
+        cache.set(dashboard._key("summary", None, None), entry)
+
+    def test_local_cache_is_refreshed_by_the_web_process(self):
+        self.serve_stale()
+        with mock.patch("app.dashboard.threading.Thread", InlineThread), mock.patch("app.dashboard.connection"):
+            data, _ = dashboard.get_widget("summary")
+        self.assertEqual(data["total_bookings"], 0)  # served stale
+
+        self.assertFalse(Job.objects.exists())
+        self.assertIsNone(cache.get(self.lock))
+        self.assertEqual(dashboard.get_widget("summary")[0]["total_bookings"], 1)
+
+    def test_shared_cache_queues_one_job(self):
+        self.serve_stale()
+        with mock.patch("app.dashboard.cache_is_shared", return_value=True):
+            dashboard.get_widget("summary")
+            dashboard.get_widget("summary")
+        job = Job.objects.get()
+        self.assertEqual(job.task, "refresh_dashboard_widget")
+
+        tasks.refresh_dashboard_widget(**job.payload)
+        self.assertIsNone(cache.get(self.lock))
+        self.assertEqual(dashboard.get_widget("summary")[0]["total_bookings"], 1)
+
+    def test_view_rejects_impossible_and_reversed_dates(self):
+        staff = User.objects.create_superuser(email="staff@example.com", password="secret-pass", phone="9000000002")
+        self.client.force_login(staff)
+        url = reverse("dashboard_widget", args=["summary"])
+
+        for params in [{"from": "2024-02-30", "to": "2024-03-02"}, {"from": "2024-03-02", "to": "2024-03-01"}]:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        self.assertEqual(self.client.get(url, {"from": "2024-03-01"}).json()["data"]["total_bookings"], 1)
+
+    def test_local_cache_is_flagged_by_the_deploy_checks(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ["app.W001"])
+        with mock.patch("app.checks.cache_is_shared", return_value=True):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class ExportDataCommandTests(TestCase):
+    def setUp(self):
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        self.bookings = [
+            make_booking(resort, date(2031, 1, 1), date(2031, 1, 2), guests, payment_status=status)
+            for guests, status in [(1, "Paid"), (2, "Pending")]
+        ]
+
+    def test_stdout_output_can_be_captured(self):
+        out = io.StringIO()
+        call_command("export_data", "bookings", "--output", "-", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(f"{self.bookings[0].id},"))
+
+        out = io.StringIO()
+        call_command("export_data", "bookings", "--format", "jsonl", "--payment-status", "Paid", "-o", "-", stdout=out)
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()], [self.bookings[0].id])
+
+    def test_file_output_reports_the_row_count(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "bookings.csv")
+        err = io.StringIO()
+        call_command("export_data", "bookings", "-o", path, stdout=io.StringIO(), stderr=err)
+        with open(path, encoding="utf-8") as fp:
+            self.assertEqual(len(fp.read().splitlines()), 3)
+        self.assertIn(f"Wrote 2 rows to {path}", err.getvalue())
+
+    def test_bad_dates_are_usage_errors(self):
+        for option, value in [("--from", "2024-02-30"), ("--to", "2024-13-01"), ("--from", "soon")]:
+            with self.subTest(option=option, value=value):
+                with self.assertRaisesMessage(CommandError, f"{option} must be a valid date."):
+                    call_command("export_data", "bookings", option, value, "-o", "-", stdout=io.StringIO())
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(title="First post", content="Hello")
+        self.url = reverse("blog_detail", args=[self.blog.id])
+
+    def test_anonymous_page_is_cached_until_its_content_changes(self):
+        self.assertContains(self.client.get(self.url), "First post")
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), "First post")
+
+        self.blog.title = "Renamed post"
+        self.blog.save()
+        self.assertContains(self.client.get(self.url), "Renamed post")
+
+    def test_logged_in_visitors_get_their_own_header(self):
+        self.client.get(self.url)
+        user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        self.client.force_login(user)
+
+        response = self.client.get(self.url)
+        self.assertContains(response, f'action="{reverse("logout")}"')
+        self.assertContains(response, "First post")
+
+
+class BookingHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="guest@example.com", password="secret-pass", phone="9000000001")
+        resorts = [
+            Resort.objects.create(name=f"Resort {i}", location="Goa", description="", price_per_guest=Decimal(1000))
+            for i in range(3)
+        ]
+        self.ids = [
+            make_booking(resorts[i % 3], date(2031, 1, 1), date(2031, 1, 2), 1, user=self.user).id
+            for i in range(25)
+        ]
+        make_booking(resorts[0], date(2031, 1, 1), date(2031, 1, 2), 1)
+        self.client.force_login(self.user)
+
+    def test_load_more_walks_the_history_newest_first(self):
+        response = self.client.get(reverse("booking_history"))
+        first = [booking.id for booking in response.context["bookings"]]
+        self.assertEqual(first, sorted(self.ids, reverse=True)[:views.BOOKING_HISTORY_PAGE_SIZE])
+
+        page = self.client.get(reverse("booking_history_page"), {"cursor": response.context["next_cursor"]}).json()
+        rest = [int(booking_id) for booking_id in re.findall(r"/booking/(\d+)/download-receipt/", page["html"])]
+        self.assertEqual(first + sorted(set(rest), reverse=True), sorted(self.ids, reverse=True))
+        self.assertIsNone(page["next_cursor"])
+
+    def test_queries_do_not_grow_with_the_page(self):
+        with CaptureQueriesContext(connection) as full_page:
+            self.client.get(reverse("booking_history"))
+        Booking.objects.filter(id__in=self.ids[:20]).delete()
+        with self.assertNumQueries(len(full_page)):
+            self.client.get(reverse("booking_history"))
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get(reverse("booking_history_page"), {"cursor": "nope"}).status_code, 400)
+
+
+class AdminExportTests(TestCase):
+    def setUp(self):
+        resort = Resort.objects.create(name="Resort", location="Goa", description="", price_per_guest=Decimal(1000))
+        self.bookings = [
+            make_booking(resort, date(2031, 1, 1), date(2031, 1, 2), guests, payment_status=status)
+            for guests, status in [(1, "Paid"), (2, "Pending"), (3, "Paid")]
+        ]
+        for booking in self.bookings:
+            Payment.objects.create(booking=booking, payment_id=f"pay_{booking.id}", payment_method="card",
+                                   amount_paid=Decimal(50))
+        staff = User.objects.create_superuser(email="staff@example.com", password="secret-pass", phone="9000000002")
+        self.client.force_login(staff)
+
+    def test_streams_filtered_rows_from_one_joined_query(self):
+        response = self.client.get(reverse("admin:app_booking_export"), {"payment_status": "Paid"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        with self.assertNumQueries(1):
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "created_at", "resort"])
+        self.assertEqual([int(line.split(",")[0]) for line in lines[1:]], [self.bookings[0].id, self.bookings[2].id])
+
+    def test_jsonl_follows_relations(self):
+        response = self.client.get(reverse("admin:app_payment_export"), {"format": "jsonl"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["resort"] for row in rows], ["Resort"] * 3)
+        self.assertEqual([row["booking_id"] for row in rows], [booking.id for booking in self.bookings])
+
+    def test_rejects_bad_parameters(self):
+        url = reverse("admin:app_guest_export")
+        for params in [{"format": "xml"}, {"from": "2024-02-30"}, {"from": "2031-01-02", "to": "2031-01-01"}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+
+class GalleryPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.images = [GalleryImage.objects.create(title=f"Photo {i}", image=f"gallery/{i}.jpg") for i in range(15)]
+        # Several uploads in the same instant must still page in a stable order
+        GalleryImage.objects.filter(id__in=[image.id for image in self.images[5:10]]).update(
+            uploaded_at=self.images[5].uploaded_at
+        )
+        self.expected = list(GalleryImage.objects.order_by("-uploaded_at", "-id").values_list("id", flat=True))
+
+    def test_first_screen_is_rendered_and_the_api_continues_it(self):
+        response = self.client.get(reverse("gallery"))
+        seen = [image.id for image in response.context["images"]]
+        self.assertEqual(len(seen), views.GALLERY_PAGE_SIZE)
+
+        cursor = response.context["next_cursor"]
+        while cursor:
+            page = self.client.get(reverse("gallery_api"), {"limit": 2, "cursor": cursor}).json()
+            seen += [item["id"] for item in page["results"]]
+            cursor = page["next_cursor"]
+        self.assertEqual(seen, self.expected)
+
+    def test_limit_is_clamped_and_bad_input_rejected(self):
+        self.assertEqual(len(self.client.get(reverse("gallery_api"), {"limit": 0}).json()["results"]), 1)
+        self.assertEqual(self.client.get(reverse("gallery_api"), {"limit": "many"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("gallery_api"), {"cursor": "nope"}).status_code, 400)
+
+
+def upload_image(name, size, mode="RGB", color="navy", **save_options):
+    """Store a generated image as ``name`` in the default storage and return its name."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, "PNG", **save_options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def open_variant(name, width, ext):
+    with default_storage.open(images.variant_path(name, width, ext), "rb") as fp:
+        image = Image.open(fp)
+        image.load()
+    return image
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+        cache.clear()
+
+    def test_generates_every_configured_width_in_webp_and_jpeg(self):
+        name = upload_image("gallery/pool.png", (2400, 1200))
+
+        self.assertEqual(images.generate_variants(name), list(images.WIDTHS))
+        for width in images.WIDTHS:
+            for ext, fmt in [("webp", "WEBP"), ("jpg", "JPEG")]:
+                with self.subTest(width=width, ext=ext):
+                    variant = open_variant(name, width, ext)
+                    self.assertEqual((variant.format, variant.size), (fmt, (width, width // 2)))
+        self.assertEqual(images.variant_widths(name), list(images.WIDTHS))
+
+    def test_small_sources_are_never_upscaled(self):
+        name = upload_image("gallery/thumb.png", (500, 300))
+
+        self.assertEqual(images.generate_variants(name), [320, 500])
+        self.assertEqual(open_variant(name, 500, "jpg").size, (500, 300))
+        self.assertFalse(default_storage.exists(images.variant_path(name, 640, "jpg")))
+
+    def test_transparency_is_flattened_onto_white_for_jpeg(self):
+        rgba = upload_image("gallery/logo.png", (400, 400), mode="RGBA", color=(255, 0, 0, 0))
+        palette = Image.new("P", (400, 400), 0)
+        palette.putpalette([255, 0, 0] * 256)
+        buffer = io.BytesIO()
+        palette.save(buffer, "PNG", transparency=0)
+        indexed = default_storage.save("gallery/indexed.png", ContentFile(buffer.getvalue()))
+
+        for name in (rgba, indexed):
+            with self.subTest(name=name):
+                width = images.generate_variants(name)[-1]
+                jpeg = open_variant(name, width, "jpg")
+                self.assertEqual(jpeg.mode, "RGB")
+                self.assertTrue(all(channel > 245 for channel in jpeg.getpixel((200, 200))))
+                self.assertEqual(open_variant(name, width, "webp").mode, "RGBA")
+
+    def test_template_tag_uses_variants_once_they_exist(self):
+        name = upload_image("gallery/beach.png", (1000, 500))
+        image = GalleryImage(title="Beach", image=name).image
+        template = Template('{% load images %}{% responsive_image image sizes="50vw" alt="Beach" %}')
+
+        plain = template.render(Context({"image": image}))
+        self.assertTrue(plain.startswith(f'<img src="{image.url}"'))
+        self.assertNotIn("srcset", plain)
+
+        images.generate_variants(name)
+        picture = template.render(Context({"image": image}))
+        self.assertTrue(picture.startswith('<picture><source type="image/webp"'))
+        self.assertIn(f'{default_storage.url(images.variant_path(name, 320, "webp"))} 320w', picture)
+        self.assertIn(f'{default_storage.url(images.variant_path(name, 1000, "jpg"))} 1000w', picture)
+        self.assertIn('sizes="50vw"', picture)
+
+    def test_saving_enqueues_variants_only_for_new_uploads(self):
+        with mock.patch("app.signals.enqueue") as enqueue:
+            photo = GalleryImage.objects.create(title="Pool", image="gallery/pool.png")
+            photo.title = "Pool at night"
+            photo.save()
+            GalleryImage.objects.get(pk=photo.pk).save()
+            photo.image = "gallery/pool-2.png"
+            photo.save()
+
+        self.assertEqual(
+            enqueue.call_args_list,
+            [
+                mock.call("generate_image_variants", name="gallery/pool.png"),
+                mock.call("generate_image_variants", name="gallery/pool-2.png"),
+            ],
+        )
+
+    def test_backfill_skips_images_that_already_have_variants(self):
+        done = GalleryImage.objects.create(title="Done", image=upload_image("gallery/done.png", (400, 200)))
+        todo = GalleryImage.objects.create(title="Todo", image=upload_image("gallery/todo.png", (400, 200)))
+        GalleryImage.objects.create(title="Broken", image=default_storage.save("gallery/broken.png", ContentFile(b"no")))
+        images.generate_variants(done.image.name)
+
+        command = "app.management.commands.generate_image_variants.generate_variants"
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch(command, wraps=images.generate_variants) as generate:
+            call_command("generate_image_variants", stdout=out, stderr=err)
+        self.assertEqual(
+            [call.args[0] for call in generate.call_args_list], ["gallery/broken.png", todo.image.name]
+        )
+        self.assertIn("Done: 1 images, 1 skipped.", out.getvalue())
+        self.assertIn("Skipped gallery/broken.png", err.getvalue())
+
+        with mock.patch(command, wraps=images.generate_variants) as generate:
+            call_command("generate_image_variants", "--force", stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(generate.call_count, 3)
@@ -6,6 +6,8 @@ urlpatterns = [
 
     # ---------------- API ----------------
     path('api/resorts/', views.resort_list, name='resort_list'),
+    path('api/resorts/available/', views.resort_availability, name='resort_availability'),
+    path('api/resorts/nearby/', views.resort_nearby, name='resort_nearby'),
     path('api/book/', views.create_booking, name='create_booking'),
     path('api/payment/', views.confirm_payment, name='confirm_payment'),
     # path('api/booking/<int:booking_id>/', views.booking_detail, name='booking_detail'),
@@ -20,6 +22,7 @@ urlpatterns = [
     path('blog/<int:blog_id>/', views.blog_detail, name='blog_detail'),
     path('contact/', views.contact, name='contact'),
     path('gallery/', views.gallery_view, name='gallery'),
+    path('api/gallery/', views.gallery_api, name='gallery_api'),
     path('events/', views.events, name='events'),
     path('testimonials/', views.testimonials, name='testimonials'),
     path('faq/', views.faq, name='faq'),
@@ -29,6 +32,7 @@ urlpatterns = [
     path('refund/<str:payment_id>/', views.refund_payment, name='refund_payment'),
     path('booking/confirmation/<int:booking_id>/', views.booking_confirmation, name='booking_confirmation'),
     path('booking/<int:booking_id>/download-receipt/', views.download_receipt, name='download_receipt'),
+    path('booking/<int:booking_id>/qr/<slug:digest>.<slug:fmt>', views.booking_qr, name='booking_qr'),
 
     # ---------------- Authentication ----------------
     path('register/', views.register, name='register'),
@@ -50,9 +54,11 @@ urlpatterns = [
     path("add-to-wishlist/<int:resort_id>/", views.add_to_wishlist, name="add_to_wishlist"),
     path("wishlist-toggle/<int:resort_id>/", views.wishlist_toggle, name="wishlist_toggle"),
     path("ajax/wishlist/add/<int:resort_id>/", views.ajax_add_wishlist, name="ajax_add_wishlist"),
+    path("api/wishlist/sync/", views.wishlist_sync, name="wishlist_sync"),
 
     # ---------------- Booking History & Refund Actions ----------------
     path("booking-history/", views.booking_history, name="booking_history"),
+    path("booking-history/more/", views.booking_history_page, name="booking_history_page"),
     path("booking/cancel/<int:booking_id>/", views.cancel_booking, name="cancel_booking"),
     path("booking/refund/<int:booking_id>/", views.refund_booking, name="refund_booking"),
     path("booking/<int:booking_id>/", views.booking_detail, name="booking_detail"),
@@ -61,6 +67,8 @@ urlpatterns = [
     
     path("verify-checkin/<int:booking_id>/", views.verify_checkin, name="verify_checkin"),
     path("admin/dashboard/", views.admin_dashboard, name="admin_dashboard"),
+    path("dashboard/api/<slug:widget>/", views.dashboard_widget, name="dashboard_widget"),
+    path("metrics", views.prometheus_metrics, name="metrics"),
 
 
 
@@ -1,56 +1,111 @@
-import os
+import hashlib
 import json
-import base64
 import logging
 import random
-from io import BytesIO
-from datetime import datetime, date
-
-import qrcode
-import razorpay
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
-from django.core.mail import send_mail, EmailMessage
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
-from django.http import JsonResponse, HttpResponse
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db.models import Count, Max
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.template.loader import get_template
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_POST
 from django.contrib.auth import password_validation
 # OR:
 # from django.contrib.auth.password_validation import validate_password
 
 
-
-# from xhtml2pdf import pisa
-
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from . import dashboard, metrics
+from .bookings import (
+    BookingError,
+    BookingUnavailable,
+    IdempotencyKeyReused,
+    clean_idempotency_key,
+    reserve_booking,
+)
+from .caching import cache_public_page
+from .jobs import PRIORITY_HIGH, enqueue
+from .pagination import InvalidCursor, paginate_keyset
+from .payments import get_or_create_order
+from .receipts import get_receipt, receipt_fingerprint
+from .wishlist import add_wishlist_item, remove_wishlist_item, sync_wishlist, toggle_wishlist, wishlist_count
+from .geo import nearby_resorts, parse_point
+from .search import search_resorts
+from .qr import QR_CONTENT_TYPES, checkin_payload, checkin_qr_url, get_qr, qr_digest
 from .models import Resort, Booking, Payment, Blog, GalleryImage, Wishlist, PasswordResetOTP
 from .forms import GalleryImageForm
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+QR_MAX_AGE = 60 * 60 * 24 * 365
+RESORTS_PAGE_SIZE = 24
+NEARBY_PAGE_SIZE = 20
+BOOKING_HISTORY_PAGE_SIZE = 20
+GALLERY_PAGE_SIZE = 12
+
 # -------------------------------------------------------------------
 #                         HELPERS
 # -------------------------------------------------------------------
 
 
-def get_wishlist_count(request):
-    if request.user.is_authenticated:
-        return Wishlist.objects.filter(user=request.user).count()
-    return 0
+def _parse_price(value):
+    try:
+        return Decimal(value)
+    except (TypeError, InvalidOperation):
+        return None
+
+
+def filter_resorts(resorts, params):
+    """Apply the index page filters (search, location, amenity, price range)."""
+    if params.get("location"):
+        resorts = resorts.filter(location__icontains=params["location"])
+    if params.get("search"):
+        resorts = search_resorts(resorts, params["search"])
+    if params.get("amenity"):
+        resorts = resorts.filter(amenities__icontains=params["amenity"])
+    min_price = _parse_price(params.get("min_price"))
+    if min_price is not None:
+        resorts = resorts.filter(price_per_guest__gte=min_price)
+    max_price = _parse_price(params.get("max_price"))
+    if max_price is not None:
+        resorts = resorts.filter(price_per_guest__lte=max_price)
+    return resorts
+
+
+RESORT_API_FIELDS = (
+    "id", "name", "location", "description", "amenities", "highlights",
+    "price_per_guest", "image", "address", "latitude", "longitude", "capacity",
+)
+RESORT_API_DEFAULT_FIELDS = ("id", "name", "location", "description", "price_per_guest", "image")
+
+
+def _serialize_resort(row, fields):
+    data = {}
+    for field in fields:
+        value = row[field]
+        if field == "price_per_guest":
+            value = float(value)
+        elif field == "image":
+            value = default_storage.url(value) if value else None
+        data[field] = value
+    return data
 
 
 # -------------------------------------------------------------------
@@ -59,15 +114,92 @@ def get_wishlist_count(request):
 
 
 def resort_list(request):
-    resorts = Resort.objects.all()
+    # Validators come from the catalog version (one aggregate query), so an
+    # unchanged catalog is answered with 304 before any rows are loaded.
+    catalog = Resort.objects.aggregate(updated=Max("updated_at"), count=Count("id"))
+    version = f"{catalog['updated']}|{catalog['count']}|{request.GET.urlencode()}"
+    etag = quote_etag(hashlib.sha256(version.encode("utf-8")).hexdigest()[:32])
+    last_modified = catalog["updated"].timestamp() if catalog["updated"] else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        fields = RESORT_API_DEFAULT_FIELDS
+        if request.GET.get("fields"):
+            fields = [f for f in request.GET["fields"].split(",") if f in RESORT_API_FIELDS]
+            if not fields:
+                return JsonResponse({"error": "No valid fields requested"}, status=400)
+        try:
+            limit = min(max(int(request.GET.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+
+        resorts = filter_resorts(Resort.objects.all(), request.GET).values(*{"id", *fields})
+        try:
+            rows, next_cursor = paginate_keyset(resorts, ("id",), request.GET.get("cursor"), limit)
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        response = JsonResponse(
+            {
+                "results": [_serialize_resort(row, fields) for row in rows],
+                "next_cursor": next_cursor,
+            }
+        )
+
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+NEARBY_API_FIELDS = ("id", "name", "location", "price_per_guest", "image", "latitude", "longitude")
+
+
+def resort_nearby(request):
+    point = parse_point(request.GET)
+    if point is None:
+        return JsonResponse({"error": "Pass valid lat and lng"}, status=400)
+    try:
+        radius_km = float(request.GET["radius_km"]) if request.GET.get("radius_km") else None
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 100)
+    except ValueError:
+        return JsonResponse({"error": "Invalid radius_km or limit"}, status=400)
+
+    resorts = filter_resorts(Resort.objects.all(), request.GET)
+    # Projected up front: nearest-K hands back the rows it already fetched
+    rows = nearby_resorts(resorts.values(*NEARBY_API_FIELDS), *point, radius_km=radius_km, limit=limit)
+    data = [
+        {**_serialize_resort(row, NEARBY_API_FIELDS), "distance_km": round(row["distance_km"], 2)}
+        for row in rows
+    ]
+    return JsonResponse(data, safe=False)
+
+
+def resort_availability(request):
+    try:
+        check_in = parse_date(request.GET.get("check_in", ""))
+        check_out = parse_date(request.GET.get("check_out", ""))
+    except ValueError:
+        # Well-formed but impossible, e.g. 2024-02-30
+        check_in = check_out = None
+    try:
+        guests = int(request.GET.get("guests", 1))
+    except ValueError:
+        guests = 0
+
+    if not check_in or not check_out or check_out <= check_in or guests < 1:
+        return JsonResponse({"error": "Invalid date range or guests"}, status=400)
+
+    resorts = Resort.objects.available(check_in, check_out, guests).values(
+        "id", "name", "location", "price_per_guest", "capacity", "booked_guests"
+    )
     data = [
         {
-            "id": r.id,
-            "name": r.name,
-            "location": r.location,
-            "description": r.description,
-            "price_per_guest": float(r.price_per_guest),
-            "image": r.image.url if r.image else None,
+            "id": r["id"],
+            "name": r["name"],
+            "location": r["location"],
+            "price_per_guest": float(r["price_per_guest"]),
+            "available_capacity": r["capacity"] - r["booked_guests"],
         }
         for r in resorts
     ]
@@ -90,18 +222,28 @@ def create_booking(request):
 
         amount = guests * resort.price_per_guest * days
 
-        booking = Booking.objects.create(
+        idempotency_key = clean_idempotency_key(
+            request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+        )
+        booking, created = reserve_booking(
+            resort,
+            idempotency_key=idempotency_key,
             guest_name=data["guest_name"],
             guest_email=data["guest_email"],
             guest_phone=data["phone"],
-            resort=resort,
             check_in=check_in,
             check_out=check_out,
             guests=guests,
             total_price=amount,
         )
 
-        return JsonResponse({"booking_id": booking.id, "amount": float(amount)})
+        return JsonResponse({"booking_id": booking.id, "amount": float(booking.total_price)})
+
+    except BookingUnavailable as e:
+        return JsonResponse({"error": str(e)}, status=409)
+
+    except IdempotencyKeyReused as e:
+        return JsonResponse({"error": str(e)}, status=422)
 
     except Exception as e:
         logger.error(e)
@@ -127,7 +269,8 @@ def confirm_payment(request):
         booking.payment_status = "Paid"
         booking.save()
 
-        send_receipt_email(booking)
+        enqueue("render_receipt", booking_id=booking.id)
+        enqueue("send_receipt_email", booking_id=booking.id)
 
         return JsonResponse(
             {
@@ -168,66 +311,56 @@ def book_resort(request, resort_id):
         advance = guests * advance_per_guest
         pending = total_price - advance
 
-        # Prevent double booking (User rapidly clicks button or refreshes)
-        last_booking = (
-            Booking.objects.filter(
+        # The form carries a one-time key, so double clicks, refreshes and
+        # retries all resolve to the same booking.
+        try:
+            booking, created = reserve_booking(
+                resort,
+                idempotency_key=clean_idempotency_key(
+                    request.POST.get("idempotency_key")
+                    or request.headers.get("Idempotency-Key")
+                ),
                 user=request.user,
-                resort=resort,
+                guest_name=guest_name,
+                guest_email=guest_email,
+                guest_phone=guest_phone,
                 check_in=check_in_d,
                 check_out=check_out_d,
+                guests=guests,
+                total_price=total_price,
+                advance_paid=advance,
+                pending_amount=pending,
+                payment_status="Pending",
+            )
+        except BookingError as e:
+            return render(
+                request,
+                "booking_form.html",
+                {
+                    "resort": resort,
+                    "error": str(e),
+                    "idempotency_key": uuid.uuid4().hex,
+                },
             )
-            .order_by("-id")
-            .first()
-        )
-
-        if last_booking:
-            if (timezone.now() - last_booking.created_at).seconds < 10:
-                return redirect("payment_page", booking_id=last_booking.id)
-
-        # Create booking
-        booking = Booking.objects.create(
-            user=request.user,
-            resort=resort,
-            guest_name=guest_name,
-            guest_email=guest_email,
-            guest_phone=guest_phone,
-            check_in=check_in_d,
-            check_out=check_out_d,
-            guests=guests,
-            total_price=total_price,
-            advance_paid=advance,
-            pending_amount=pending,
-            payment_status="Pending",
-        )
 
-        # Generate QR
-        qr_url = request.build_absolute_uri(f"/verify-checkin/{booking.id}/")
-        qr_img = qrcode.make(qr_url)
-        buffer = BytesIO()
-        qr_img.save(buffer, format="PNG")
-        booking.qr_code.save(f"qr_{booking.id}.png", ContentFile(buffer.getvalue()))
+        if not created:
+            return redirect("payment_page", booking_id=booking.id)
 
-        # Razorpay order creation
-        client = razorpay.Client(
-            auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-        )
-        order = client.order.create(
-            {
-                "amount": int(advance * 100),
-                "currency": "INR",
-                "payment_capture": 1,
-            }
-        )
+        # Generate QR in the background
+        enqueue("generate_booking_qr", booking_id=booking.id, url=checkin_payload(request, booking))
 
-        booking.razorpay_order_id = order["id"]
-        booking.save()
+        # Razorpay order creation (payment_page reuses this order)
+        get_or_create_order(booking, advance * 100)
 
         return redirect("payment_page", booking_id=booking.id)
 
     return render(
         request,
         "booking_form.html",
-        {"resort": resort, "wishlist_count": get_wishlist_count(request)},
+        {
+            "resort": resort,
+            "idempotency_key": uuid.uuid4().hex,
+        },
     )
 
 
@@ -240,24 +373,11 @@ def payment_page(request, booking_id):
         days = 1
 
     # Advance: ₹50 × guests
-    amount = booking.guests * 50  # rupees
+    amount = booking.guests * getattr(settings, "ADVANCE_PAYMENT_AMOUNT", 50)  # rupees
     pay_amount_paise = amount * 100  # paise
 
-    client = razorpay.Client(
-        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-    )
-
-    order = client.order.create(
-        {
-            "amount": pay_amount_paise,
-            "currency": "INR",
-            "receipt": f"receipt_{booking.id}",
-            "payment_capture": 1,
-        }
-    )
-
-    booking.razorpay_order_id = order["id"]
-    booking.save()
+    # Reuses the order created at booking time unless the amount changed
+    order_id = get_or_create_order(booking, pay_amount_paise)
 
     return render(
         request,
@@ -266,23 +386,40 @@ def payment_page(request, booking_id):
             "booking": booking,
             "days": days,
             "amount": amount,
-            "order_id": order["id"],
+            "order_id": order_id,
             "razorpay_key": settings.RAZORPAY_KEY_ID,
-            "wishlist_count": get_wishlist_count(request),
+            "qr_url": checkin_qr_url(request, booking),
         },
     )
 
 
+def _booking_history_page(request, cursor=None):
+    bookings = Booking.objects.filter(user=request.user).select_related("resort")
+    return paginate_keyset(bookings, ("-id",), cursor, BOOKING_HISTORY_PAGE_SIZE)
+
+
 @login_required(login_url="/signin/")
 def booking_history(request):
-    bookings = Booking.objects.filter(user=request.user).order_by("-id")
+    bookings, next_cursor = _booking_history_page(request)
     return render(
         request,
         "booking_history.html",
-        {"bookings": bookings, "wishlist_count": get_wishlist_count(request)},
+        {"bookings": bookings, "next_cursor": next_cursor},
     )
 
 
+@login_required(login_url="/signin/")
+def booking_history_page(request):
+    """Next page of booking history cards for the "Load more" button."""
+    try:
+        bookings, next_cursor = _booking_history_page(request, request.GET.get("cursor"))
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    html = render_to_string("partials/booking_history_cards.html", {"bookings": bookings}, request)
+    return JsonResponse({"html": html, "next_cursor": next_cursor})
+
+
 @login_required(login_url="/signin/")
 def cancel_booking(request, booking_id):
     booking = get_object_or_404(
@@ -310,15 +447,9 @@ def cancel_booking(request, booking_id):
 def booking_detail(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
-    qr = qrcode.make(f"Booking ID: {booking.id}, Name: {booking.guest_name}")
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    qr_code = base64.b64encode(buffer.getvalue()).decode()
-
     context = {
         "booking": booking,
-        "qr_code": qr_code,
-        "wishlist_count": get_wishlist_count(request),
+        "qr_url": checkin_qr_url(request, booking),
     }
     return render(request, "booking_detail.html", context)
 
@@ -326,18 +457,40 @@ def booking_detail(request, booking_id):
 def booking_confirmation(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
-    qr = qrcode.make(request.build_absolute_uri())
-    buffer = BytesIO()
-    qr.save(buffer)
-    img = base64.b64encode(buffer.getvalue()).decode()
-
     return render(
         request,
         "booking_confirmed.html",
-        {"booking": booking, "qr_code": img, "wishlist_count": get_wishlist_count(request)},
+        {
+            "booking": booking,
+            "qr_url": checkin_qr_url(request, booking),
+        },
     )
 
 
+# The digest in the URL identifies the image content, so a matching
+# If-None-Match is answered with 304 before touching the database. Only the
+# image under its current digest is immutable; the redirect away from a
+# stale digest must be revalidated, since the booking may change again.
+def booking_qr(request, booking_id, digest, fmt):
+    if fmt not in QR_CONTENT_TYPES:
+        raise Http404("Unsupported QR format")
+
+    etag = quote_etag(f"{digest}.{fmt}")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        booking = get_object_or_404(Booking, id=booking_id)
+        payload = checkin_payload(request, booking)
+        if qr_digest(payload) != digest:
+            response = redirect("booking_qr", booking_id=booking.id, digest=qr_digest(payload), fmt=fmt)
+            response["Cache-Control"] = "no-cache"
+            return response
+        response = FileResponse(default_storage.open(get_qr(payload, fmt)), content_type=QR_CONTENT_TYPES[fmt])
+
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={QR_MAX_AGE}, immutable"
+    return response
+
+
 def verify_checkin(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
@@ -351,98 +504,30 @@ def verify_checkin(request, booking_id):
     return render(
         request,
         "verify_checkin.html",
-        {"booking": booking, "status": status, "wishlist_count": get_wishlist_count(request)},
+        {"booking": booking, "status": status},
     )
 
 
 def download_receipt(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
-
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f"attachment; filename=Receipt_{booking.id}.pdf"
-
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-
-    y = height - 60
-
-    # Logo (optional)
-    logo_path = os.path.join(settings.BASE_DIR, "static", "images", "logo.png")
-    if os.path.exists(logo_path):
-        p.drawImage(logo_path, 40, y - 80, width=120, preserveAspectRatio=True)
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(180, y - 40, "Manthan Resorts")
-    p.setFont("Helvetica", 11)
-    p.drawString(180, y - 60, "Premium Resort Booking Receipt")
-
-    y -= 120
-    p.line(40, y, width - 40, y)
-    y -= 30
-
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(40, y, "Booking Receipt")
-    y -= 30
-
-    p.setFont("Helvetica-Bold", 13)
-    p.drawString(40, y, f"Booking ID: #{booking.id}")
-    y -= 25
-
-    # Guest details
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(40, y, "Guest Information")
-    y -= 20
-    p.setFont("Helvetica", 12)
-    p.drawString(40, y, f"Name: {booking.guest_name}")
-    y -= 18
-    p.drawString(40, y, f"Email: {booking.guest_email}")
-    y -= 18
-    p.drawString(40, y, f"Phone: {booking.guest_phone}")
-    y -= 32
-
-    # Stay details
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(40, y, "Stay Details")
-    y -= 20
-    p.setFont("Helvetica", 12)
-    p.drawString(40, y, f"Resort: {booking.resort.name}")
-    y -= 18
-    p.drawString(40, y, f"Check-in: {booking.check_in}")
-    y -= 18
-    p.drawString(40, y, f"Check-out: {booking.check_out}")
-    y -= 18
-    p.drawString(40, y, f"Guests: {booking.guests}")
-    y -= 32
-
-    # Payment summary
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(40, y, "Payment Summary")
-    y -= 20
-    p.setFont("Helvetica", 12)
-    p.drawString(40, y, f"Advance Paid: ₹{booking.advance_paid}")
-    y -= 18
-    p.drawString(40, y, f"Pending at Check-in: ₹{booking.pending_amount}")
-    y -= 25
-
-    y_space_for_qr = y
-
-    if booking.qr_code and os.path.exists(booking.qr_code.path):
-        p.drawImage(
-            booking.qr_code.path, width - 200, y_space_for_qr - 140, width=130, height=130
-        )
-
-    y -= 160
-
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(40, y, "Thank you for choosing Manthan Resorts!")
-    y -= 15
-    p.setFont("Helvetica", 10)
-    p.drawString(40, y, "This receipt serves as proof of advance booking payment.")
-    y -= 12
-    p.drawString(40, y, "Show the QR code at the resort for smooth check-in.")
+    booking = get_object_or_404(Booking.objects.select_related("resort"), id=booking_id)
 
-    p.showPage()
-    p.save()
+    fingerprint = receipt_fingerprint(booking)
+    path = get_receipt(booking)
+    last_modified = default_storage.get_modified_time(path)
 
+    response = get_conditional_response(
+        request, etag=quote_etag(fingerprint), last_modified=last_modified.timestamp()
+    )
+    if response is None:
+        response = FileResponse(
+            default_storage.open(path),
+            as_attachment=True,
+            filename=f"Receipt_{booking.id}.pdf",
+            content_type="application/pdf",
+        )
+    response["ETag"] = quote_etag(fingerprint)
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    response["Cache-Control"] = "private, no-cache"
     return response
 
 
@@ -451,23 +536,33 @@ def download_receipt(request, booking_id):
 # -------------------------------------------------------------------
 
 
+@cache_public_page("resorts")
 def index(request):
-    resorts = Resort.objects.all()
-
-    if request.GET.get("location"):
-        resorts = resorts.filter(location__icontains=request.GET["location"])
+    resorts = filter_resorts(Resort.objects.all(), request.GET)
     if request.GET.get("search"):
-        resorts = resorts.filter(name__icontains=request.GET["search"])
+        resorts = resorts.order_by("search_rank", "id")
+    else:
+        resorts = resorts.order_by("id")
 
+    # "Near me" mode: ?lat=&lng=[&radius_km=] sorts by distance
+    point = parse_point(request.GET)
+    if point is not None:
+        try:
+            radius_km = float(request.GET.get("radius_km") or 0) or None
+        except ValueError:
+            radius_km = None
+        resorts = nearby_resorts(resorts, *point, radius_km=radius_km, limit=NEARBY_PAGE_SIZE)
+
+    page = Paginator(resorts, RESORTS_PAGE_SIZE).get_page(request.GET.get("page"))
     return render(
         request,
         "index.html",
         {
-            "resorts": resorts,
+            "resorts": page,
+            "page_obj": page,
             "locations": Resort.objects.values_list(
                 "location", flat=True
             ).distinct(),
-            "wishlist_count": get_wishlist_count(request),
         },
     )
 
@@ -477,32 +572,37 @@ def resort_detail(request, resort_id):
     return render(
         request,
         "resort_detail.html",
-        {"resort": resort, "wishlist_count": get_wishlist_count(request)},
+        {"resort": resort},
     )
 
 
+@cache_public_page()
 def about_us(request):
-    return render(request, "about_us.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "about_us.html")
 
 
+@cache_public_page()
 def events(request):
-    return render(request, "events.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "events.html")
 
 
+@cache_public_page()
 def testimonials(request):
-    return render(request, "testimonials.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "testimonials.html")
 
 
+@cache_public_page()
 def faq(request):
-    return render(request, "faq.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "faq.html")
 
 
+@cache_public_page()
 def team(request):
-    return render(request, "team.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "team.html")
 
 
 def contact(request):
-    return render(request, "contact.html", {"wishlist_count": get_wishlist_count(request)})
+    return render(request, "contact.html")
 
 
 # -------------------------------------------------------------------
@@ -514,19 +614,19 @@ def blog(request):
     return blog_list(request)
 
 
+@cache_public_page("blog")
 def blog_list(request):
     blogs = Blog.objects.all().order_by("-date_posted")
-    return render(
-        request, "blog.html", {"blogs": blogs, "wishlist_count": get_wishlist_count(request)}
-    )
+    return render(request, "blog.html", {"blogs": blogs})
 
 
+@cache_public_page("blog")
 def blog_detail(request, blog_id):
     blog_obj = get_object_or_404(Blog, id=blog_id)
     return render(
         request,
         "blog_detail.html",
-        {"blog": blog_obj, "wishlist_count": get_wishlist_count(request)},
+        {"blog": blog_obj},
     )
 
 
@@ -539,12 +639,46 @@ def gallery_view(request):
     return gallery(request)
 
 
+GALLERY_ORDERING = ("-uploaded_at", "-id")
+
+
+@cache_public_page("gallery")
 def gallery(request):
-    images = GalleryImage.objects.all().order_by("-uploaded_at")
+    # Only the first screen is rendered here; the rest streams in from gallery_api
+    images, next_cursor = paginate_keyset(
+        GalleryImage.objects.all(), GALLERY_ORDERING, limit=GALLERY_PAGE_SIZE
+    )
     return render(
         request,
         "gallery.html",
-        {"images": images, "wishlist_count": get_wishlist_count(request)},
+        {"images": images, "next_cursor": next_cursor},
+    )
+
+
+@cache_public_page("gallery")
+def gallery_api(request):
+    try:
+        limit = min(max(int(request.GET.get("limit", GALLERY_PAGE_SIZE)), 1), 100)
+        images, next_cursor = paginate_keyset(
+            GalleryImage.objects.all(), GALLERY_ORDERING, request.GET.get("cursor"), limit
+        )
+    except (ValueError, InvalidCursor) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(
+        {
+            "results": [
+                {
+                    "id": img.id,
+                    "title": img.title,
+                    "image": img.image.url,
+                    "uploaded_at": img.uploaded_at,
+                }
+                for img in images
+            ],
+            "html": render_to_string("partials/gallery_items.html", {"images": images}, request),
+            "next_cursor": next_cursor,
+        }
     )
 
 
@@ -556,7 +690,7 @@ def upload_image(request):
     return render(
         request,
         "upload_image.html",
-        {"form": form, "wishlist_count": get_wishlist_count(request)},
+        {"form": form},
     )
 
 
@@ -567,17 +701,13 @@ def upload_image(request):
 
 @require_POST
 def refund_payment(request, payment_id):
-    payment = get_object_or_404(Payment, payment_id=payment_id)
+    payment = get_object_or_404(Payment.objects.select_related("booking"), payment_id=payment_id)
     booking = payment.booking
     booking.payment_status = "Refunded"
     booking.save()
+    metrics.REFUNDS.labels("processed").inc()
 
-    send_mail(
-        "Refund Processed",
-        f"Your refund of ₹{booking.total_price} is processed.",
-        settings.EMAIL_HOST_USER,
-        [booking.guest_email],
-    )
+    enqueue("send_refund_email", booking_id=booking.id)
 
     return redirect("booking_confirmation", booking.id)
 
@@ -587,6 +717,7 @@ def refund_booking(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
     if booking.guest_email != request.user.email:
+        metrics.REFUNDS.labels("rejected").inc()
         messages.error(request, "This booking does not belong to your account.")
         return redirect("booking_history")
 
@@ -602,6 +733,7 @@ def refund_booking(request, booking_id):
         )
 
     if payment.refunded:
+        metrics.REFUNDS.labels("already_refunded").inc()
         messages.warning(request, "Refund already processed.")
         return redirect("booking_history")
 
@@ -613,6 +745,7 @@ def refund_booking(request, booking_id):
     booking.payment_status = "Refunded"
     booking.booking_status = "Cancelled"
     booking.save()
+    metrics.REFUNDS.labels("processed").inc()
 
     messages.success(
         request,
@@ -621,21 +754,6 @@ def refund_booking(request, booking_id):
     return redirect("booking_history")
 
 
-def send_receipt_email(booking):
-    html = get_template("receipt.html").render({"booking": booking})
-    pdf_buffer = BytesIO()
-    pisa.CreatePDF(BytesIO(html.encode("utf-8")), dest=pdf_buffer)
-
-    mail = EmailMessage(
-        "Your Receipt",
-        "Attached is your receipt.",
-        settings.EMAIL_HOST_USER,
-        [booking.guest_email],
-    )
-    mail.attach("receipt.pdf", pdf_buffer.getvalue(), "application/pdf")
-    mail.send()
-
-
 # -------------------------------------------------------------------
 #                         PASSWORD RULES
 # -------------------------------------------------------------------
@@ -734,7 +852,6 @@ def signin(request):
                 "signin.html",
                 {
                     "errmsg": "Email and password are required.",
-                    "wishlist_count": get_wishlist_count(request),
                 },
             )
 
@@ -749,15 +866,10 @@ def signin(request):
             "signin.html",
             {
                 "errmsg": "Invalid email or password.",
-                "wishlist_count": get_wishlist_count(request),
             },
         )
 
-    return render(
-        request,
-        "signin.html",
-        {"wishlist_count": get_wishlist_count(request)},
-    )
+    return render(request, "signin.html")
 
 
 def userlogout(request):
@@ -779,24 +891,16 @@ def request_password_reset(request):
             user = User.objects.get(email=email)
         except User.DoesNotExist:
             context["errmsg"] = "No account found with that email."
-            context["wishlist_count"] = get_wishlist_count(request)
             return render(request, "request_password_reset.html", context)
 
         code = f"{random.randint(100000, 999999)}"
-        PasswordResetOTP.objects.create(user=user, otp=code)
-
-        send_mail(
-            subject="Your Password Reset OTP - The Arabian",
-            message=f"Your OTP for password reset is: {code}",
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
+        otp = PasswordResetOTP.objects.create(user=user, otp=code)
+
+        enqueue("send_password_reset_otp", priority=PRIORITY_HIGH, otp_id=otp.id)
 
         request.session["reset_user_id"] = user.id
         return redirect("verify_reset_otp")
 
-    context["wishlist_count"] = get_wishlist_count(request)
     return render(request, "request_password_reset.html", context)
 
 
@@ -826,7 +930,6 @@ def verify_reset_otp(request):
             request.session["otp_verified"] = True
             return redirect("reset_password")
 
-    context["wishlist_count"] = get_wishlist_count(request)
     return render(request, "verify_reset_otp.html", context)
 
 
@@ -861,7 +964,6 @@ def reset_password(request):
             except ValidationError as e:
                 context["errmsg"] = str(e)
 
-    context["wishlist_count"] = get_wishlist_count(request)
     return render(request, "reset_password.html", context)
 
 
@@ -875,7 +977,7 @@ def profile(request):
     return render(
         request,
         "profile.html",
-        {"user": request.user, "wishlist_count": get_wishlist_count(request)},
+        {"user": request.user},
     )
 
 
@@ -888,11 +990,11 @@ def wishlist_page(request):
     if not request.user.is_authenticated:
         return redirect("signin")
 
-    items = Wishlist.objects.filter(user=request.user)
+    items = Wishlist.objects.filter(user=request.user).select_related("resort")
     return render(
         request,
         "wishlist.html",
-        {"items": items, "wishlist_count": get_wishlist_count(request)},
+        {"items": items},
     )
 
 
@@ -901,8 +1003,7 @@ def add_to_wishlist(request, resort_id):
         messages.error(request, "Please login to continue.", extra_tags="wishlist")
         return redirect("signin")
 
-    resort = Resort.objects.get(id=resort_id)
-    Wishlist.objects.get_or_create(user=request.user, resort=resort)
+    add_wishlist_item(request.user, resort_id)
 
     messages.success(request, "Added to wishlist!", extra_tags="wishlist")
 
@@ -913,7 +1014,7 @@ def remove_from_wishlist(request, resort_id):
     if not request.user.is_authenticated:
         return redirect("signin")
 
-    Wishlist.objects.filter(user=request.user, resort_id=resort_id).delete()
+    remove_wishlist_item(request.user, resort_id)
     messages.success(request, "Removed from wishlist!")
     return redirect(request.META.get("HTTP_REFERER", "wishlist"))
 
@@ -922,25 +1023,17 @@ def wishlist_toggle(request, resort_id):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "login_required"}, status=403)
 
-    resort = get_object_or_404(Resort, id=resort_id)
-    existing = Wishlist.objects.filter(user=request.user, resort=resort)
-
-    if existing.exists():
-        existing.delete()
-        in_wishlist = False
-        message = "Removed from wishlist"
-    else:
-        Wishlist.objects.create(user=request.user, resort=resort)
-        in_wishlist = True
-        message = "Added to wishlist!"
-
-    count = Wishlist.objects.filter(user=request.user).count()
+    try:
+        in_wishlist = toggle_wishlist(request.user, resort_id)
+    except Resort.DoesNotExist:
+        raise Http404("Resort not found")
+    message = "Added to wishlist!" if in_wishlist else "Removed from wishlist"
 
     return JsonResponse(
         {
             "in_wishlist": in_wishlist,
             "message": message,
-            "count": count,
+            "count": wishlist_count(request.user),
         }
     )
 
@@ -952,21 +1045,36 @@ def ajax_add_wishlist(request, resort_id):
             {"status": "error", "message": "Please login first!"}
         )
 
-    resort = get_object_or_404(Resort, id=resort_id)
-
-    wishlist, created = Wishlist.objects.get_or_create(
-        user=request.user, resort=resort
-    )
+    try:
+        added = toggle_wishlist(request.user, resort_id)
+    except Resort.DoesNotExist:
+        raise Http404("Resort not found")
 
-    if created:
+    if added:
         return JsonResponse({"status": "added", "message": "Added to wishlist!"})
     else:
-        wishlist.delete()
         return JsonResponse(
             {"status": "removed", "message": "Removed from wishlist!"}
         )
 
 
+@require_POST
+def wishlist_sync(request):
+    """Apply a client's offline wishlist edits: {"add": [ids], "remove": [ids]}."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "login_required"}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        add = [int(resort_id) for resort_id in data.get("add", [])]
+        remove = [int(resort_id) for resort_id in data.get("remove", [])]
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({"error": "Invalid data"}, status=400)
+
+    resort_ids = sync_wishlist(request.user, add=add, remove=remove)
+    return JsonResponse({"resort_ids": resort_ids, "count": len(resort_ids)})
+
+
 # -------------------------------------------------------------------
 #                         ADMIN DASHBOARD
 # -------------------------------------------------------------------
@@ -977,55 +1085,35 @@ def admin_dashboard(request):
     if not request.user.is_staff:
         return redirect("index")
 
-    total_users = User.objects.count()
-    total_bookings = Booking.objects.count()
-    total_revenue = (
-        Booking.objects.filter(payment_status="Paid")
-        .aggregate(total=Sum("total_price"))["total"]
-        or 0
-    )
-    today_bookings = Booking.objects.filter(
-        created_at__date=date.today()
-    ).count()
-
-    monthly_data = (
-        Booking.objects.filter(payment_status="Paid")
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(
-            revenue=Sum("total_price"),
-            bookings=Count("id"),
-        )
-        .order_by("month")
-    )
+    # The page is a shell; each widget loads from dashboard_widget in parallel
+    return render(request, "admin_dashboard.html", {"widgets": list(dashboard.WIDGETS)})
 
-    labels = [item["month"].strftime("%b %Y") for item in monthly_data]
-    revenue_data = [float(item["revenue"]) for item in monthly_data]
-    bookings_data = [item["bookings"] for item in monthly_data]
 
-    top_resorts_qs = (
-        Booking.objects.values("resort__name")
-        .annotate(count=Count("id"))
-        .order_by("-count")[:5]
-    )
+@cache_control(private=True, max_age=dashboard.FRESH_FOR)
+def dashboard_widget(request, widget):
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({"error": "staff_required"}, status=403)
+    if widget not in dashboard.WIDGETS:
+        raise Http404("Unknown widget")
 
-    top_resort_labels = [item["resort__name"] for item in top_resorts_qs]
-    top_resort_counts = [item["count"] for item in top_resorts_qs]
+    try:
+        date_from = parse_date(request.GET.get("from", ""))
+        date_to = parse_date(request.GET.get("to", ""))
+    except ValueError:
+        return JsonResponse({"error": "Pass dates as YYYY-MM-DD"}, status=400)
+    if date_from and date_to and date_from > date_to:
+        return JsonResponse({"error": "from must not be after to"}, status=400)
 
-    top_resorts = list(zip(top_resort_labels, top_resort_counts))
+    data, computed_at = dashboard.get_widget(widget, date_from, date_to)
+    return JsonResponse({"data": data, "computed_at": http_date(computed_at)})
+
+
+# -------------------------------------------------------------------
+#                         METRICS
+# -------------------------------------------------------------------
 
-    context = {
-        "total_users": total_users,
-        "total_bookings": total_bookings,
-        "total_revenue": total_revenue,
-        "today_bookings": today_bookings,
-        "labels": labels,
-        "revenue_data": revenue_data,
-        "bookings_data": bookings_data,
-        "top_resorts": top_resorts,
-        "top_resort_labels": top_resort_labels,
-        "top_resort_counts": top_resort_counts,
-        "wishlist_count": get_wishlist_count(request),
-    }
 
-    return render(request, "admin_dashboard.html", context)
+def prometheus_metrics(request):
+    if not metrics.scrape_allowed(request):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.latest(), content_type=CONTENT_TYPE_LATEST)
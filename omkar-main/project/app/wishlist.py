@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import cache_is_shared
+from .models import Resort, Wishlist
+
+COUNT_TIMEOUT = 60 * 60 * 24
+# A per-process cache only sees the toggles its own worker handled, so
+# other workers' copies must expire quickly
+LOCAL_COUNT_TIMEOUT = 10
+
+
+def _wishlist_table():
+    return connection.ops.quote_name(Wishlist._meta.db_table)
+
+
+def _resort_table():
+    return connection.ops.quote_name(Resort._meta.db_table)
+
+
+def _count_key(user_id):
+    return f"wishlist_count:{user_id}"
+
+
+def wishlist_count(user):
+    """Number of resorts in ``user``'s wishlist, counted at most once per cache lifetime."""
+    if not user.is_authenticated:
+        return 0
+    key = _count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Wishlist.objects.filter(user=user).count()
+        cache.set(key, count, COUNT_TIMEOUT if cache_is_shared() else LOCAL_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_wishlist_count(user_id, delta):
+    key = _count_key(user_id)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass  # Not cached; the next read counts from the database
+
+
+def forget_wishlist_count(user_id):
+    """Drop the cached count, e.g. after bulk operations that skip signals."""
+    cache.delete(_count_key(user_id))
+
+
+def add_wishlist_item(user, resort_id):
+    """
+    Insert the (user, resort) row and return ``True``, or ``False`` if it
+    was already there or the resort does not exist. One statement: the
+    unique constraint settles concurrent clicks, and selecting from the
+    resort table keeps unknown ids out even where foreign keys are only
+    checked at commit.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {_wishlist_table()} (user_id, resort_id, added_on) "
+            f"SELECT %s, id, %s FROM {_resort_table()} WHERE id = %s "
+            "ON CONFLICT DO NOTHING",
+            [user.pk, connection.ops.adapt_datetimefield_value(timezone.now()), resort_id],
+        )
+        added = cursor.rowcount > 0
+    if added:
+        adjust_wishlist_count(user.pk, 1)
+    return added
+
+
+def remove_wishlist_item(user, resort_id):
+    """
+    Delete the (user, resort) row in one statement and return whether it
+    was there. Raw SQL, because QuerySet.delete() first selects the rows
+    for the post_delete receivers; the count is adjusted here instead, as
+    add_wishlist_item() does for post_save.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {_wishlist_table()} "
+            "WHERE user_id = %s AND resort_id = %s",
+            [user.pk, resort_id],
+        )
+        removed = cursor.rowcount > 0
+    if removed:
+        adjust_wishlist_count(user.pk, -1)
+    return removed
+
+
+def toggle_wishlist(user, resort_id):
+    """
+    Add the resort if absent, otherwise remove it. Returns the new state.
+
+    Adding takes a single INSERT; only when nothing was inserted is the row
+    deleted. Raises ``Resort.DoesNotExist`` for unknown resorts.
+    """
+    if add_wishlist_item(user, resort_id):
+        return True
+    if remove_wishlist_item(user, resort_id):
+        return False
+    # Neither inserted nor deleted: the resort does not exist, or a
+    # concurrent click removed the entry first
+    if not Resort.objects.filter(pk=resort_id).exists():
+        raise Resort.DoesNotExist
+    return False
+
+
+def sync_wishlist(user, add=(), remove=()):
+    """
+    Apply offline wishlist changes in bulk and return the resulting resort ids.
+
+    Unknown resort ids in ``add`` are ignored; ids in both lists are removed.
+    """
+    remove = set(remove)
+    add = set(add) - remove
+    with transaction.atomic():
+        if add:
+            existing = Resort.objects.filter(id__in=add).values_list("id", flat=True)
+            Wishlist.objects.bulk_create(
+                [Wishlist(user=user, resort_id=resort_id) for resort_id in existing],
+                ignore_conflicts=True,
+            )
+        if remove:
+            Wishlist.objects.filter(user=user, resort_id__in=remove).delete()
+    # bulk_create skips post_save, so recount on the next read
+    forget_wishlist_count(user.pk)
+    return list(Wishlist.objects.filter(user=user).values_list("resort_id", flat=True))
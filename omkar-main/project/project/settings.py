@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.instrumentation.RequestMetricsMiddleware',
+    'app.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +70,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.wishlist',
+                'app.context_processors.page_cache',
             ],
         },
     },
@@ -76,10 +83,40 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Tuned for several workers sharing one SQLite file:
+#  - WAL lets readers run alongside the single writer, and synchronous=NORMAL
+#    is crash-safe in WAL mode while skipping an fsync per commit. It is
+#    opt-in (SQLITE_WAL=1) because switching rewrites the database header for
+#    good, which would dirty the committed db.sqlite3; see .gitignore. To go
+#    back, run "PRAGMA journal_mode=DELETE" with every worker stopped.
+#  - BEGIN IMMEDIATE takes the write lock when a transaction starts, so
+#    writers queue on the busy timeout instead of failing with "database is
+#    locked" when a read lock cannot be upgraded mid-transaction. SQLite
+#    ignores select_for_update(); this is what serializes reserve_booking().
+#  - timeout is how many seconds a writer waits for that lock.
+# ``manage.py benchmark_sqlite`` compares these options with SQLite's defaults.
+SQLITE_WAL = config('SQLITE_WAL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        # On disk rather than in memory, so tests that race threads see real
+        # SQLite locking (the shared in-memory cache fails instead of waiting).
+        # The PID keeps concurrent runs on one host off each other's file.
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), f'resort-test-{os.getpid()}.sqlite3')},
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': config('SQLITE_TIMEOUT', default=20, cast=int),
+            'init_command': (
+                ('PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;' if SQLITE_WAL else '')
+                + 'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
@@ -129,11 +166,40 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Razorpay Keys (make sure these are test mode keys if you're testing)
-from decouple import config
 
 RAZORPAY_KEY_ID = ("rzp_test_XOpDUHOXnhxpCa")
 RAZORPAY_KEY_SECRET = ("eXBU02I34Eqz6ROddkBtmqff")
 
+# Seconds an unpaid Razorpay order is reused before a new one is created
+RAZORPAY_ORDER_TTL = 24 * 60 * 60
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default. Point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. FileBasedCache + a directory, Redis, Memcached) when running
+# several web or worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='the-arabian'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+
+# Seconds a rendered public page (or page fragment) stays cached
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=600, cast=int)
+
+# When set, /metrics only answers requests with "Authorization: Bearer <token>"
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Opt-in profiling (see app/profiling.py): cProfile a fraction of requests
+# and keep sampled stacks of every request slower than PROFILING_SLOW_MS
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=1000, cast=int)
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', default=500, cast=int)
+
 
 
 
@@ -142,16 +208,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGGING = {
     'version': 1,
+    'formatters': {
+        'json': {
+            '()': 'pythonjsonlogger.json.JsonFormatter',
+            'fmt': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        # One JSON line per request, written off the request thread
+        'requests': {
+            '()': 'app.instrumentation.QueuedStreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'app.requests': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG',
+        'level': 'INFO',
     },
 }
+# Silences the request log above while the test suite runs
+TEST_RUNNER = 'app.test_runner.TestRunner'
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587